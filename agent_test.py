@@ -3,12 +3,34 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import timeit
 import unittest
 
+import benchmark
 import isolation
+import competition_agent
 import game_agent
+import lazy_smp
+import opening_book
+import ratings
+import sample_players
+import sprt
+import tournament
 
 from importlib import reload
+from isolation import perft
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class IsolationTest(unittest.TestCase):
@@ -20,6 +42,632 @@ class IsolationTest(unittest.TestCase):
         self.player2 = "Player2"
         self.game = isolation.Board(self.player1, self.player2)
 
+    def test_transposition_table_preserves_values(self):
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.improved_score)
+        reference = game_agent.AlphaBetaPlayer(
+            score_fn=game_agent.improved_score, tt_entries=0)
+        for agent in (player, reference):
+            agent.time_left = lambda: 1e9
+        game = isolation.Board(player, self.player2)
+        reference_game = isolation.Board(reference, self.player2)
+        for _ in range(6):
+            move = random.choice(game.get_legal_moves())
+            game.apply_move(move)
+            reference_game.apply_move(move)
+        for depth in range(2, 7):
+            self.assertEqual(
+                player.maxValue(game, float("-inf"), float("inf"), depth),
+                reference.maxValue(reference_game, float("-inf"), float("inf"), depth))
+
+    def test_pvs_matches_alphabeta(self):
+        player = game_agent.AlphaBetaPlayer(
+            score_fn=game_agent.custom_score_2, search_mode="pvs")
+        reference = game_agent.AlphaBetaPlayer(
+            score_fn=game_agent.custom_score_2, tt_entries=0, move_ordering=False)
+        for agent in (player, reference):
+            agent.time_left = lambda: 1e9
+        game = isolation.Board(player, self.player2)
+        reference_game = isolation.Board(reference, self.player2)
+        for _ in range(8):
+            move = random.choice(game.get_legal_moves())
+            game.apply_move(move)
+            reference_game.apply_move(move)
+        for depth in range(2, 7):
+            self.assertEqual(
+                player.maxValue(game, float("-inf"), float("inf"), depth),
+                reference.maxValue(reference_game, float("-inf"), float("inf"), depth))
+
+    def test_aspiration_matches_full_window(self):
+        player = game_agent.AlphaBetaPlayer(
+            score_fn=game_agent.improved_score, tt_entries=0,
+            move_ordering=False, aspiration_window=1.)
+        reference = game_agent.AlphaBetaPlayer(
+            score_fn=game_agent.improved_score, tt_entries=0,
+            move_ordering=False)
+        for agent in (player, reference):
+            agent.time_left = lambda: 1e9
+        game = isolation.Board(player, self.player2, seed=0)
+        reference_game = isolation.Board(reference, self.player2, seed=0)
+        rng = random.Random(0)
+        for _ in range(6):
+            move = rng.choice(sorted(game.get_legal_moves()))
+            game.apply_move(move)
+            reference_game.apply_move(move)
+
+        search = player.alphabeta
+        windows = []
+
+        def recording_alphabeta(game, depth, alpha=float("-inf"), beta=float("inf")):
+            windows.append((alpha, beta))
+            return search(game, depth, alpha, beta)
+
+        player.alphabeta = recording_alphabeta
+        for depth in range(2, 6):
+            reference.alphabeta(reference_game, depth)
+            value = reference._root_score
+            self.assertNotIn(value, (float("-inf"), float("inf")))
+            # A guess from the previous iteration, and guesses far enough
+            # below and above the value to force a fail-high and a fail-low
+            search(game, depth - 1)
+            for guess, expected_windows in (
+                    (player._root_score, None),
+                    (value - 10., [(value - 11., value - 9.),
+                                   (value - 11., float("inf"))]),
+                    (value + 10., [(value + 9., value + 11.),
+                                   (float("-inf"), value + 11.)])):
+                player._root_score = guess
+                del windows[:]
+                best_move = player._aspiration_search(game, depth)
+                self.assertEqual(player._root_score, value)
+                # Equal moves are tried in shuffled order, so the root move
+                # may differ from the reference but must be worth as much
+                reference_game.push(best_move)
+                self.assertEqual(reference.minValue(
+                    reference_game, float("-inf"), float("inf"), depth), value)
+                reference_game.pop()
+                if expected_windows is not None:
+                    self.assertEqual(windows, expected_windows)
+
+    def test_pondering_searches_opponent_replies(self):
+        player = game_agent.AlphaBetaPlayer(
+            score_fn=game_agent.improved_score, ponder=True)
+        game = isolation.Board(player, self.player2)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        start = timeit.default_timer()
+        move = player.get_move(
+            game.copy(), lambda: 50 - 1000 * (timeit.default_timer() - start))
+        # Pondering ends by itself after as long as our own turn
+        time.sleep(0.2)
+        self.assertEqual(player._ponder_active.value, player._ponder_id)
+        while player._ponder_reports.get(timeout=1)[1] is not None:
+            pass
+        player._pondering = False
+        self.assertTrue(player._ponder_process.is_alive())
+        player.close()
+        self.assertFalse(player._ponder_process.is_alive())
+
+        player = game_agent.AlphaBetaPlayer(
+            score_fn=game_agent.improved_score, ponder=True)
+        game = isolation.Board(player, self.player2)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        start = timeit.default_timer()
+        move = player.get_move(
+            game.copy(), lambda: 100 - 1000 * (timeit.default_timer() - start))
+        time.sleep(0.05)
+        player._stop_pondering()
+        player.close()
+        game.apply_move(move)
+        for reply in game.get_legal_moves():
+            key = game.forecast_move(reply).hash()
+            self.assertIn(key, player._ponder_results)
+
+    def test_opening_book_moves_are_played(self):
+        entries = opening_book.build_book(plies=1, depth=2)
+        key, transform = self.game.canonical_hash()
+        self.assertEqual(list(entries), [key])
+        book_move = self.game.from_canonical(entries[key], transform)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "book.bin")
+            opening_book.write_book(path, entries)
+            book = opening_book.OpeningBook(path)
+            self.assertEqual(book.lookup(self.game), book_move)
+            self.game.apply_move((0, 0))
+            self.assertIsNone(book.lookup(self.game))
+
+            player = game_agent.AlphaBetaPlayer(opening_book=book)
+            game = isolation.Board(player, self.player2)
+            self.assertEqual(player.get_move(game, lambda: 0.), book_move)
+            book._data.close()
+
+    def test_cpu_clock_ignores_time_spent_waiting(self):
+        class SleepyPlayer:
+            def get_move(self, game, time_left):
+                time.sleep(0.03)
+                moves = game.get_legal_moves()
+                return moves[0] if moves else (-1, -1)
+
+        sleepy = SleepyPlayer()
+        for clock in ("wall", "process", "thread"):
+            game = isolation.Board(sleepy, sample_players.RandomPlayer())
+            winner, _, termination = game.play(time_limit=20, clock=clock)
+            self.assertEqual(termination == "timeout", clock == "wall")
+        with self.assertRaises(ValueError):
+            game.play(clock="sundial")
+
+    def test_custom_score_before_opponent_moves(self):
+        # The ratio heuristic does not need the player's location, so it
+        # also scores a player that has not moved yet
+        for cls in (isolation.Board, isolation.BitBoard):
+            game = cls(self.player1, self.player2)
+            game.apply_move((3, 3))
+            self.assertEqual(game_agent.custom_score(game, self.player2), 6.0)
+            self.assertEqual(game_agent.custom_score(game, self.player1), 8. / 48)
+
+    def test_composite_scores_match_component_heuristics(self):
+        for cls in (isolation.Board, isolation.BitBoard):
+            game = cls(self.player1, self.player2)
+            game.apply_move(random.choice(game.get_legal_moves()))
+            game.apply_move(random.choice(game.get_legal_moves()))
+            while True:
+                for player in (self.player1, self.player2):
+                    improved = game_agent.improved_score(game, player)
+                    open_moves = game_agent.open_move_score(game, player)
+                    center = game_agent.center_score(game, player)
+                    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+                    if improved in (float("inf"), float("-inf")):
+                        ratio = improved
+                    elif opp_moves == 0:
+                        ratio = float("inf")
+                    else:
+                        ratio = open_moves / opp_moves
+                    self.assertEqual(game_agent.custom_score(game, player), ratio)
+                    if improved in (float("inf"), float("-inf")):
+                        self.assertEqual(game_agent.custom_score_2(game, player), improved)
+                        self.assertEqual(game_agent.custom_score_3(game, player), improved)
+                        continue
+                    self.assertEqual(game_agent.custom_score_2(game, player),
+                                     5.626514543962844 * improved +
+                                     2.1318059635578575 * open_moves +
+                                     -1.20092114580893 * center)
+                    self.assertEqual(game_agent.custom_score_3(game, player),
+                                     min(ratio / 8., improved / 7., open_moves / 8.,
+                                         center / ((game.width / 2.)**2 + (game.height / 2.)**2)))
+                if not game.get_legal_moves():
+                    break
+                game.apply_move(random.choice(game.get_legal_moves()))
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_batched_leaves_match_scalar_search(self):
+        for score_fn in (game_agent.improved_score, game_agent.open_move_score,
+                         game_agent.center_score, game_agent.custom_score_2):
+            for _ in range(5):
+                game = isolation.BitBoard(self.player1, self.player2)
+                for _ in range(random.randint(1, 20)):
+                    if not game.get_legal_moves():
+                        break
+                    game.apply_move(random.choice(game.get_legal_moves()))
+                if not game.get_legal_moves():
+                    continue
+                scores = []
+                for batch_leaves in (False, True):
+                    player = game_agent.AlphaBetaPlayer(
+                        score_fn=score_fn, tt_entries=0, batch_leaves=batch_leaves)
+                    player.time_left = lambda: 1e9
+                    board = lazy_smp.restore_board(lazy_smp.describe_board(game, self.player1), player)
+                    player.alphabeta(board, 3)
+                    scores.append(player._root_score)
+                self.assertEqual(scores[0], scores[1])
+
+    def test_evaluation_cache_is_bounded(self):
+        cache = game_agent.EvaluationCache(game_agent.custom_score_2, max_entries=8)
+        for _ in range(5):
+            game = isolation.Board(self.player1, self.player2)
+            game.apply_move(random.choice(game.get_legal_moves()))
+            game.apply_move(random.choice(game.get_legal_moves()))
+            while game.get_legal_moves():
+                for player in (self.player1, self.player2):
+                    self.assertEqual(cache(game, player),
+                                     game_agent.custom_score_2(game, player))
+                    self.assertEqual(cache(game, player),
+                                     game_agent.custom_score_2(game, player))
+                game.apply_move(random.choice(game.get_legal_moves()))
+                self.assertLessEqual(len(cache), 8)
+        self.assertEqual(cache.hits, cache.misses)
+
+    def test_search_stats_count_nodes(self):
+        reports = []
+        player = game_agent.MinimaxPlayer(search_depth=2, stats_sink=reports.append)
+        game = isolation.Board(player, self.player2)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        nodes, leaves = 1, 0
+        for move in game.get_legal_moves():
+            child = game.forecast_move(move)
+            replies = child.get_legal_moves()
+            nodes += 1 + len(replies)
+            leaves += len(replies) or 1
+        player.get_move(game, lambda: 1e9)
+        self.assertEqual(reports, [player.stats])
+        self.assertEqual((player.stats.nodes, player.stats.leaf_evaluations,
+                          player.stats.depth), (nodes, leaves, 2))
+
+        player = game_agent.AlphaBetaPlayer(collect_stats=True)
+        game = isolation.Board(player, self.player2)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        start = timeit.default_timer()
+        player.get_move(game, lambda: 200 - 1000 * (timeit.default_timer() - start))
+        stats = player.stats
+        self.assertEqual([i[0] for i in stats.iterations], list(range(1, stats.depth + 1)))
+        self.assertGreaterEqual(stats.nodes, sum(i[1] for i in stats.iterations))
+        self.assertGreater(stats.cutoffs, 0)
+        self.assertGreater(stats.nodes_per_second, 0)
+        self.assertIsNone(player._stats)
+
+    def test_seeded_search_visits_same_nodes(self):
+        for board_class in (isolation.Board, isolation.BitBoard):
+            visits = []
+            for _ in range(2):
+                visited = []
+
+                def score(game, player):
+                    visited.append(game.hash())
+                    return sample_players.improved_score(game, player)
+
+                player = game_agent.AlphaBetaPlayer(score_fn=score)
+                player.time_left = lambda: float("inf")
+                opponent = sample_players.RandomPlayer(seed=3)
+                game = board_class(player, opponent, seed=7)
+                game.apply_move((2, 3))
+                game.apply_move(opponent.get_move(game, None))
+                player.alphabeta(game, 5)
+                visits.append(visited)
+            self.assertGreater(len(visits[0]), 100)
+            self.assertEqual(visits[0], visits[1])
+
+    def test_mcts_reuses_tree_after_reply(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for rollout in (competition_agent.ROLLOUT_RANDOM,
+                            competition_agent.ROLLOUT_HEURISTIC):
+                player = competition_agent.CustomPlayer(
+                    data=os.path.join(tmpdir, "missing.bin"), rollout=rollout)
+                game = isolation.Board(player, self.player2)
+                game.apply_move((3, 3))
+                game.apply_move((0, 0))
+                start = timeit.default_timer()
+                time_left = lambda: 100 - 1000 * (timeit.default_timer() - start)
+                move = player.get_move(game, time_left)
+                self.assertIn(move, game.get_legal_moves())
+                self.assertGreater(player.playouts, 0)
+                self.assertGreater(player.playouts_per_second, 0)
+
+                game.apply_move(move)
+                reply = player._root.best_child().move
+                game.apply_move(reply)
+                visits = player._root.children[reply].visits
+                self.assertIs(player._find_root(game), player._root.children[reply])
+                self.assertGreater(visits, 0)
+
+    def test_mcts_returns_in_time(self):
+        # The default time limit is too long for a quick test, but the
+        # cleanup after the search takes as long at any limit
+        mcts_player = competition_agent.CustomPlayer(seed=0)
+        for game_num in range(2):
+            players = [mcts_player, game_agent.AlphaBetaPlayer()]
+            if game_num % 2:
+                players.reverse()
+            game = isolation.Board(*players)
+            move_times = []
+            _, _, outcome = game.play(time_limit=30, move_times=move_times)
+            self.assertNotEqual(outcome, "timeout")
+            self.assertLess(max(move_times[game_num % 2::2]), 30)
+
+
+class TournamentTest(unittest.TestCase):
+    """Check the tournament runners and their statistics"""
+
+    def test_parallel_tables_count_every_game(self):
+        cpu_agents = [tournament.Agent(sample_players.RandomPlayer(), "Random")]
+        test_agents = [tournament.Agent(sample_players.RandomPlayer(), "R{}".format(i))
+                       for i in range(4)]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            tournament.play_matches_parallel(cpu_agents, test_agents, 2, processes=1)
+        row = output.getvalue().splitlines()[3].split()
+        self.assertEqual(row[:2], ["1", "Random"])
+        counts = [int(field) for field in row[2:] if field != "|"]
+        self.assertEqual([a + b for a, b in zip(counts[::2], counts[1::2])], [4] * 4)
+
+        pondering = tournament.Agent(game_agent.AlphaBetaPlayer(ponder=True), "Ponder")
+        with self.assertRaises(ValueError), contextlib.redirect_stdout(io.StringIO()):
+            tournament.play_matches_parallel(cpu_agents, [pondering], 2, processes=1)
+
+    def test_logged_tournament_resumes_from_log(self):
+        cpu_agents = [tournament.Agent(sample_players.RandomPlayer(), "Random")]
+        test_agents = [tournament.Agent(sample_players.RandomPlayer(), "R{}".format(i))
+                       for i in range(4)]
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, "results.jsonl")
+            with contextlib.redirect_stdout(io.StringIO()):
+                tournament.play_logged_matches(cpu_agents, test_agents, 1, log_path)
+            records = list(tournament.read_log(log_path))
+            self.assertEqual(len(records), 8)
+            for record in records:
+                # the loser's final turn is timed but not in the history
+                self.assertEqual(len(record["move_times"]), len(record["moves"]) + 1)
+                self.assertEqual(record["opening"], records[0]["opening"])
+
+            # Drop the last game and leave a partly written record behind
+            with open(log_path) as log_file:
+                lines = log_file.readlines()
+            with open(log_path, "w") as log_file:
+                log_file.writelines(lines[:7])
+                log_file.write(lines[7][:10])
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                tournament.play_logged_matches(cpu_agents, test_agents, 2, log_path)
+            self.assertIn("Playing 9 games (7 already", output.getvalue())
+            resumed = list(tournament.read_log(log_path))
+            self.assertEqual(resumed[:7], records[:7])
+            self.assertEqual(len({tournament._game_key(r) for r in resumed}), 16)
+
+    def test_sprt_stops_decided_pairings(self):
+        strong, weak = sprt.SPRT(), sprt.SPRT()
+        for _ in range(20):
+            strong.add_pair(2)
+            weak.add_pair(0)
+        self.assertEqual(strong.result, sprt.H1)
+        self.assertEqual(weak.result, sprt.H0)
+        elo, lower, upper = strong.elo_interval()
+        self.assertTrue(0 < lower < elo <= upper)
+
+        close = sprt.SPRT()
+        for score in (0, 1, 2, 1):
+            close.add_pair(score)
+        self.assertIsNone(close.result)
+        self.assertAlmostEqual(close.elo_interval()[0], 0.)
+
+        cpu_agents = [tournament.Agent(sample_players.RandomPlayer(), "Random")]
+        test_agents = [tournament.Agent(sample_players.RandomPlayer(), "R{}".format(i))
+                       for i in range(2)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            tests = tournament.play_sequential_matches(cpu_agents, test_agents, 3)
+        self.assertEqual(len(tests), 2)
+        for test in tests.values():
+            self.assertTrue(test.result is not None or test.games == 6)
+
+
+    def test_rating_store_persists_and_rates_new_agents(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ratings.json")
+            store = ratings.RatingStore(path)
+            for stronger, weaker in [("A", "B"), ("B", "C")]:
+                store.record(stronger, weaker, 30)
+                store.record(weaker, stronger, 10)
+            elo = {name: rating for name, (rating, _) in store.ratings().items()}
+            self.assertGreater(elo["A"], elo["B"])
+            self.assertGreater(elo["B"], elo["C"])
+            self.assertEqual(sorted(store.anchors("D")), ["A", "B", "C"])
+            self.assertEqual(store.anchors("D", count=2), ["C", "A"])
+            store.save()
+            self.assertEqual(ratings.RatingStore(path).ratings(), store.ratings())
+
+            cpu_agents = [tournament.Agent(sample_players.RandomPlayer(), name)
+                          for name in "ABC"]
+            test_agents = [tournament.Agent(sample_players.RandomPlayer(), "R{}".format(i))
+                           for i in range(4)]
+            with contextlib.redirect_stdout(io.StringIO()):
+                tournament.play_rated_matches(cpu_agents, test_agents, 1, store)
+            saved = ratings.RatingStore(path)
+            self.assertEqual(saved.games("B"), 80 + 8)
+            for agent in test_agents:
+                self.assertEqual(saved.games(agent.name), 6)
+
+            # An agent that loses every game keeps a large error, but is not
+            # played again once it has enough games
+            for _ in range(ratings.SETTLED_GAMES // 2):
+                saved.record("A", "W", 2)
+            self.assertFalse(saved.is_rated("W"))
+            self.assertTrue(saved.is_settled("W"))
+            with self.assertRaises(ValueError):
+                tournament.play_rated_matches(cpu_agents, cpu_agents[:1], 1, saved)
+
+
+class BenchmarkTest(unittest.TestCase):
+    """Check the benchmark suite and its regression checks"""
+
+    def test_quick_run_and_compare(self):
+        self.assertEqual(benchmark.benchmark_positions(count=2),
+                         benchmark.benchmark_positions(count=2))
+        results = benchmark.run_benchmarks(select="board", quick=True)
+        names = set(results["results"])
+        self.assertIn("board/BitBoard/get_legal_moves", names)
+        self.assertIn("board/Board/apply_move", names)
+        self.assertEqual(benchmark.compare(results, results), [])
+
+        baseline = json.loads(json.dumps(results))
+        for result in baseline["results"].values():
+            result["value"] /= 2
+        baseline["results"]["board/Board/hash"]["higher_is_better"] = True
+        regressions = benchmark.compare(results, baseline,
+                                        thresholds=[("board/Board/*", 1.5)])
+        self.assertEqual(sorted(r[0] for r in regressions),
+                         sorted(name for name in names if name.startswith("board/BitBoard/")))
+
+
+class BitBoardTest(unittest.TestCase):
+    """Check that isolation.BitBoard matches the reference isolation.Board"""
+
+    def setUp(self):
+        self.player1 = "Player1"
+        self.player2 = "Player2"
+
+    def test_random_games_match_reference(self):
+        for width, height in [(7, 7), (5, 8)]:
+            for _ in range(20):
+                board = isolation.Board(self.player1, self.player2, width, height)
+                bitboard = isolation.BitBoard(self.player1, self.player2, width, height)
+                while True:
+                    moves = sorted(board.get_legal_moves())
+                    self.assertEqual(moves, sorted(bitboard.get_legal_moves()))
+                    self.assertEqual(board.to_string(), bitboard.to_string())
+                    self.assertEqual(board.zobrist, bitboard.zobrist)
+                    for player in (self.player1, self.player2):
+                        self.assertEqual(board.utility(player), bitboard.utility(player))
+                        self.assertEqual(board.mobility(player),
+                                         len(board.get_legal_moves(player)))
+                        self.assertEqual(bitboard.mobility(player),
+                                         len(bitboard.get_legal_moves(player)))
+                        self.assertEqual(board.get_player_location(player),
+                                         bitboard.get_player_location(player))
+                    if not moves:
+                        break
+                    move = random.choice(moves)
+                    board.apply_move(move)
+                    bitboard = bitboard.forecast_move(move)
+
+    def test_zobrist_matches_full_recomputation(self):
+        cell_keys, p1_keys, p2_keys, side_key = \
+            isolation.isolation.zobrist_keys(7, 7)
+        game = isolation.BitBoard(self.player1, self.player2)
+        while game.get_legal_moves():
+            game = game.forecast_move(random.choice(game.get_legal_moves()))
+            state = game._board_state
+            key = side_key if state[-3] else 0
+            for idx, blocked in enumerate(state[:-3]):
+                if blocked:
+                    key ^= cell_keys[idx]
+            key ^= p1_keys[state[-1]]
+            if state[-2] is not None:
+                key ^= p2_keys[state[-2]]
+            self.assertEqual(key, game.hash())
+
+    def test_push_pop_restores_state(self):
+        for cls in (isolation.Board, isolation.BitBoard):
+            game = cls(self.player1, self.player2)
+            history = []
+            while game.get_legal_moves():
+                history.append((game.to_string(), game.hash(),
+                                game.move_count, game.active_player))
+                game.push(random.choice(game.get_legal_moves()))
+            while history:
+                game.pop()
+                self.assertEqual(history.pop(), (game.to_string(), game.hash(),
+                                                 game.move_count, game.active_player))
+                for player in (self.player1, self.player2):
+                    self.assertEqual(game.mobility(player),
+                                     len(game.get_legal_moves(player)))
+
+
+    def test_perft_matches_reference(self):
+        # 49 first moves, 48 replies, then every knight move from the first
+        # cell except onto the second player
+        game = isolation.Board(self.player1, self.player2)
+        depth_3 = sum(len(game.forecast_move(a).forecast_move(b).get_legal_moves())
+                      for a in game.get_blank_spaces()
+                      for b in game.forecast_move(a).get_blank_spaces())
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class(self.player1, self.player2)
+            self.assertEqual([perft.perft(game, d) for d in range(4)],
+                             [1, 49, 49 * 48, depth_3])
+        self.assertEqual(perft.verify(isolation.BitBoard, 3), [])
+
+        game = isolation.BitBoard(self.player1, self.player2)
+        for move in [(3, 3), (2, 2), (1, 4), (0, 0)]:
+            game.apply_move(move)
+        key = game.hash()
+        counts = perft.divide(game, 5)
+        self.assertEqual(sum(counts.values()), perft.perft(game, 5))
+        self.assertEqual(perft.perft(game, 5, {}), perft.perft(game, 5))
+        self.assertEqual(game.hash(), key)
+        empty = isolation.BitBoard(self.player1, self.player2, 5, 5)
+        self.assertEqual(perft.perft(empty, 5, {}), perft.perft(empty, 5))
+        self.assertEqual(perft.perft(game, 0), 1)
+        self.assertEqual(perft.perft(game, -1), 1)
+        with self.assertRaises(ValueError):
+            perft.divide(game, 0)
+
+    def test_symmetric_positions_share_canonical_hash(self):
+        for width, height, count in [(7, 7, 8), (5, 8, 4)]:
+            self.assertEqual(len(isolation.isolation.symmetry_tables(width, height)), count)
+            games = [cls(self.player1, self.player2, width, height)
+                     for cls in (isolation.Board, isolation.BitBoard)
+                     for _ in range(count)]
+            while games[0].get_legal_moves():
+                move = random.choice(games[0].get_legal_moves())
+                for i, game in enumerate(games):
+                    game.apply_move(game.to_canonical(move, i % count))
+                key, transform = games[0].canonical_hash()
+                self.assertEqual({game.canonical_hash()[0] for game in games}, {key})
+                self.assertLessEqual(key, games[0].hash())
+                canonical_move = games[0].to_canonical(move, transform)
+                self.assertEqual(games[0].from_canonical(canonical_move, transform), move)
+
+
+class EndgameTest(unittest.TestCase):
+    """Check the separated endgame solver against exhaustive search"""
+
+    def active_player_wins(self, game):
+        for move in game.get_legal_moves():
+            game.push(move)
+            wins = self.active_player_wins(game)
+            game.pop()
+            if not wins:
+                return True
+        return False
+
+    def test_solver_matches_exhaustive_search(self):
+        solved = 0
+        while solved < 20:
+            game = isolation.BitBoard("Player1", "Player2")
+            while game.get_legal_moves() and not (
+                    game.move_count > 2 and isolation.endgame.is_partitioned(game)):
+                game.apply_move(random.choice(game.get_legal_moves()))
+            solution = isolation.endgame.solve_endgame(game)
+            if solution is None or len(game.get_blank_spaces()) > 20:
+                continue
+            winner, move = solution
+            self.assertEqual(winner == game.active_player,
+                             self.active_player_wins(game))
+            if move is not None:
+                game.push(move)
+                self.assertEqual(winner == game.inactive_player,
+                                 not self.active_player_wins(game))
+            solved += 1
+
+
+class LazySMPTest(unittest.TestCase):
+    """Unit tests for the shared memory search helpers"""
+
+    def test_restore_board_reproduces_state(self):
+        for num_moves in range(6):
+            game = isolation.BitBoard("Player1", "Player2")
+            for _ in range(num_moves):
+                game.apply_move(random.choice(game.get_legal_moves()))
+            description = lazy_smp.describe_board(game, "Player2")
+            board = lazy_smp.restore_board(description, "Player2")
+            self.assertEqual(game.hash(), board.hash())
+            self.assertEqual(game.to_string(), board.to_string())
+            self.assertEqual(board.get_player_location("Player2"),
+                             game.get_player_location("Player2"))
+
+    def test_shared_table_round_trip(self):
+        table = lazy_smp.SharedTranspositionTable(64)
+        try:
+            other = lazy_smp.SharedTranspositionTable(64, name=table.name)
+            table.store(2**64 - 1, 5, game_agent.LOWER_BOUND, -2.5, (6, 3))
+            table.store(0, 3, game_agent.EXACT, float("inf"), None)
+            self.assertEqual(other.probe(2**64 - 1),
+                             (2**64 - 1, 5, game_agent.LOWER_BOUND, -2.5, (6, 3), 0))
+            self.assertEqual(other.probe(0),
+                             (0, 3, game_agent.EXACT, float("inf"), None, 0))
+            self.assertIsNone(other.probe(1))
+            other.close()
+        finally:
+            table.close(unlink=True)
+
 
 if __name__ == '__main__':
     unittest.main()
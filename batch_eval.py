@@ -0,0 +1,154 @@
+"""Evaluate all the children of a search node at once with NumPy.
+
+The children of a node differ only in the cell the active player moves to,
+so their features can be derived from the parent board without applying
+any move: the mover's mobility is the number of open neighbours of its
+destination, and the other player's mobility drops by one when the
+destination is one of its own knight moves. `BoardBatch` computes these
+for every child as arrays and evaluates the standard heuristics on them in
+vectorized form, giving exactly the scores of the scalar functions.
+
+Search agents use a batch at the last ply, in place of visiting each leaf
+(see the `batch_leaves` option of `game_agent.AlphaBetaPlayer`).
+"""
+import numpy as np
+
+import game_agent
+from isolation.isolation import knight_neighbours
+
+
+# Cache of (knight adjacency matrix, squared center distances) keyed by
+# (width, height)
+_BATCH_TABLES = {}
+
+
+def batch_tables(width, height):
+    """Return the NumPy lookup tables for a board of the given size.
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray)
+        A boolean matrix that is True where two cell indices are a knight
+        move apart, and the squared distance from each cell index to the
+        center of the board (the value of `game_agent.center_score`).
+    """
+    key = (width, height)
+    tables = _BATCH_TABLES.get(key)
+    if tables is None:
+        size = width * height
+        adjacency = np.zeros((size, size), dtype=bool)
+        for idx, neighbours in enumerate(knight_neighbours(width, height)):
+            adjacency[idx, list(neighbours)] = True
+        w, h = width / 2., height / 2.
+        center = np.array([float((h - idx % height)**2 + (w - idx // height)**2)
+                           for idx in range(size)])
+        tables = _BATCH_TABLES[key] = (adjacency, center)
+    return tables
+
+
+class BoardBatch:
+    """The positions reached by each of a list of moves of the active
+    player.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The parent position. The inactive player must have moved.
+
+    moves : list<(int, int)>
+        Legal moves of the active player.
+    """
+    def __init__(self, game, moves):
+        self.mover = game.active_player
+        self.other = game.inactive_player
+        other_loc = game.get_player_location(self.other)
+        if other_loc is None:
+            raise ValueError("The inactive player has not moved")
+
+        height = game.height
+        adjacency, center = batch_tables(game.width, height)
+        cells = np.array([r + c * height for r, c in moves], dtype=np.intp)
+        other_cell = other_loc[0] + other_loc[1] * height
+
+        self.mover_moves = np.array([game.degree(m) for m in moves])
+        self.other_moves = game.degree(other_loc) - adjacency[other_cell, cells]
+        # The player to move in every child is the other player, so the
+        # children where it cannot move are won by the mover
+        self.terminal = self.other_moves == 0
+        self.mover_center = center[cells]
+        self.other_center = center[other_cell]
+
+    def features(self, player):
+        """Return the terminal value of the children for the player (INFINITY
+        if the player is the mover, NEGATIVE_INFINITY otherwise, applying to
+        the children in `terminal`), and the player's mobility, its
+        opponent's mobility and its squared distance to the center in each
+        child (arrays, or a scalar when it is the same in every child).
+        """
+        if player == self.mover:
+            return (game_agent.INFINITY, self.mover_moves, self.other_moves,
+                    self.mover_center)
+        if player == self.other:
+            return (game_agent.NEGATIVE_INFINITY, self.other_moves,
+                    self.mover_moves, self.other_center)
+        raise RuntimeError("Invalid player in batch: {}".format(player))
+
+    def improved_score(self, player):
+        """Vectorized `game_agent.improved_score` of every child. """
+        value, own_moves, opp_moves, _ = self.features(player)
+        return np.where(self.terminal, value, own_moves - opp_moves)
+
+    def open_move_score(self, player):
+        """Vectorized `game_agent.open_move_score` of every child. """
+        value, own_moves, _, _ = self.features(player)
+        return np.where(self.terminal, value, own_moves)
+
+    def center_score(self, player):
+        """Vectorized `game_agent.center_score` of every child. """
+        value, _, _, center = self.features(player)
+        return np.where(self.terminal, value, center)
+
+    def custom_score_2(self, player):
+        """Vectorized `game_agent.custom_score_2` of every child. """
+        value, own_moves, opp_moves, center = self.features(player)
+        c1, c2, c3 = game_agent.CUSTOM_SCORE_2_WEIGHTS
+        score = (c1*(own_moves - opp_moves)) + (c2*own_moves) + (c3*center)
+        return np.where(self.terminal, value, score)
+
+
+# Batched versions of the scalar score functions, keyed by (module, name) so
+# that the lookup still works after the modules are reloaded
+BATCH_SCORES = {
+    ("game_agent", "improved_score"): BoardBatch.improved_score,
+    ("game_agent", "open_move_score"): BoardBatch.open_move_score,
+    ("game_agent", "center_score"): BoardBatch.center_score,
+    ("game_agent", "custom_score_2"): BoardBatch.custom_score_2,
+    ("sample_players", "improved_score"): BoardBatch.improved_score,
+    ("sample_players", "open_move_score"): BoardBatch.open_move_score,
+    ("sample_players", "center_score"): BoardBatch.center_score,
+}
+
+
+def batch_scorer(score_fn):
+    """Return a function that evaluates every child of a position with the
+    given score function, or None if it has no batched version.
+
+    Parameters
+    ----------
+    score_fn : callable
+        A scalar score function, such as `game_agent.improved_score`.
+
+    Returns
+    -------
+    callable or None
+        A function (game, moves, player) -> list<float> giving the score
+        for the player of the position after each move.
+    """
+    method = BATCH_SCORES.get((getattr(score_fn, "__module__", None),
+                               getattr(score_fn, "__name__", None)))
+    if method is None:
+        return None
+
+    def score_children(game, moves, player):
+        return method(BoardBatch(game, moves), player).tolist()
+    return score_children
@@ -0,0 +1,386 @@
+"""Micro and macro benchmarks for the Isolation boards, heuristics and search
+agents, with regression checks against a stored baseline.
+
+Three groups of benchmarks run on a fixed set of positions reached by seeded
+random play (see `benchmark_positions`):
+
+- `board/...`: `get_legal_moves`, `forecast_move`, `copy`, `hash` and
+  `apply_move` of `isolation.Board` and `isolation.BitBoard`, in
+  microseconds per call
+- `heuristic/...`: every evaluation function in `game_agent` and
+  `sample_players`, in microseconds per call
+- `search/...`: fixed-depth `MinimaxPlayer` and `AlphaBetaPlayer` searches
+  (milliseconds and nodes for all positions) and fixed-time
+  `AlphaBetaPlayer` searches (nodes per second and completed depth)
+
+Boards are seeded, so fixed-depth searches visit the same nodes in every
+run and their node counts only change with the search itself. Timings are
+the best of several repeats.
+
+Run the suite and write the results as JSON with:
+
+    python benchmark.py --output results.json
+
+and compare a run against a baseline, exiting with status 1 if any result
+is worse than the baseline by more than its threshold:
+
+    python benchmark.py --baseline baseline.json --threshold 0.1 \\
+        --threshold-for "search/*=0.25"
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+
+import game_agent
+import sample_players
+
+from isolation import Board, BitBoard
+
+# Plies of random play before each benchmark position, and the number of
+# positions at each ply
+POSITION_PLIES = (2, 8, 14, 20)
+POSITIONS_PER_PLY = 4
+POSITION_SEED = 2017
+
+BOARD_CLASSES = (Board, BitBoard)
+
+HEURISTICS = [
+    ("game_agent", game_agent.custom_score),
+    ("game_agent", game_agent.custom_score_2),
+    ("game_agent", game_agent.custom_score_3),
+    ("game_agent", game_agent.improved_score),
+    ("game_agent", game_agent.open_move_score),
+    ("game_agent", game_agent.center_score),
+    ("sample_players", sample_players.null_score),
+    ("sample_players", sample_players.open_move_score),
+    ("sample_players", sample_players.improved_score),
+    ("sample_players", sample_players.center_score),
+]
+
+MINIMAX_DEPTH = 3
+ALPHABETA_DEPTH = 5
+SEARCH_TIME_LIMIT = 100  # milliseconds per fixed-time search
+
+# Relative change beyond which a result counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def benchmark_positions(plies=POSITION_PLIES, count=POSITIONS_PER_PLY,
+                        seed=POSITION_SEED):
+    """Return the move sequences of the benchmark positions.
+
+    Each position is reached by seeded random play, and games that end
+    before the requested ply are skipped, so the positions are the same in
+    every run.
+
+    Returns
+    -------
+    list<list<(int, int)>>
+        The moves leading to each position.
+    """
+    positions = []
+    game_seed = seed
+    for ply in plies:
+        found = 0
+        while found < count:
+            game_seed += 1
+            rng = random.Random(game_seed)
+            game = BitBoard("Player1", "Player2")
+            moves = []
+            while len(moves) < ply:
+                legal_moves = sorted(game.get_legal_moves())
+                if not legal_moves:
+                    break
+                moves.append(rng.choice(legal_moves))
+                game.apply_move(moves[-1])
+            if len(moves) == ply and game.get_legal_moves():
+                positions.append(moves)
+                found += 1
+    return positions
+
+
+def make_board(board_class, moves, player_1="Player1", player_2="Player2",
+               seed=POSITION_SEED):
+    """Return a seeded board of the given class with the moves applied. """
+    game = board_class(player_1, player_2, seed=seed)
+    for move in moves:
+        game.apply_move(move)
+    return game
+
+
+def time_per_call(fn, calls, repeat=5, min_time=0.05):
+    """Return the best time of `fn` over `repeat` runs in microseconds per
+    call, where each run of `fn` makes `calls` calls to the code being
+    timed and the number of runs per measurement is chosen so that a
+    measurement lasts at least `min_time` seconds.
+    """
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return 1e6 * min(timer.repeat(repeat, number)) / (number * calls)
+
+
+def _result(value, unit, higher_is_better=False):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def board_benchmarks(positions, repeat=5, min_time=0.05):
+    """Time the board primitives on every position. """
+    results = {}
+    for board_class in BOARD_CLASSES:
+        games = [make_board(board_class, moves) for moves in positions]
+        replies = [game.get_legal_moves()[0] for game in games]
+        prefix = "board/{}/".format(board_class.__name__)
+
+        for name in ("get_legal_moves", "copy", "hash"):
+            methods = [getattr(game, name) for game in games]
+
+            def call():
+                for method in methods:
+                    method()
+
+            results[prefix + name] = _result(
+                time_per_call(call, len(games), repeat, min_time), "us")
+
+        methods = [game.forecast_move for game in games]
+
+        def forecast():
+            for method, move in zip(methods, replies):
+                method(move)
+
+        results[prefix + "forecast_move"] = _result(
+            time_per_call(forecast, len(games), repeat, min_time), "us")
+
+        # apply_move changes the board, so each call gets a fresh copy made
+        # outside of the timed region
+        best = float("inf")
+        for _ in range(repeat):
+            copies = [game.copy() for game in games for _ in range(50)]
+            moves = [move for move in replies for _ in range(50)]
+            start = timeit.default_timer()
+            for game, move in zip(copies, moves):
+                game.apply_move(move)
+            best = min(best, timeit.default_timer() - start)
+        results[prefix + "apply_move"] = _result(1e6 * best / len(copies), "us")
+    return results
+
+
+def heuristic_benchmarks(positions, repeat=5, min_time=0.05):
+    """Time every heuristic on every position, from the point of view of
+    the active player.
+    """
+    games = [make_board(BitBoard, moves) for moves in positions]
+    results = {}
+    for module, score_fn in HEURISTICS:
+        def evaluate():
+            for game in games:
+                score_fn(game, game.active_player)
+
+        results["heuristic/{}.{}".format(module, score_fn.__name__)] = _result(
+            time_per_call(evaluate, len(games), repeat, min_time), "us")
+    return results
+
+
+def _search_board(player, moves):
+    """Return a seeded board at the position with the player to move. """
+    if len(moves) % 2:
+        return make_board(BitBoard, moves, "Opponent", player)
+    return make_board(BitBoard, moves, player, "Opponent")
+
+
+def _fixed_depth(make_player, positions, depth, iterative, repeat):
+    """Search every position to a fixed depth with a fresh player, and
+    return the best total time in milliseconds and the number of nodes.
+    """
+    best, nodes = float("inf"), 0
+    for _ in range(repeat):
+        nodes = 0
+        elapsed = 0.
+        for moves in positions:
+            player = make_player()
+            game = _search_board(player, moves)
+            count = [0]
+
+            def time_left():
+                count[0] += 1
+                return float("inf")
+
+            player.time_left = time_left
+            start = timeit.default_timer()
+            if iterative:
+                for d in range(1, depth + 1):
+                    player.alphabeta(game, d)
+            else:
+                player.minimax(game, depth)
+            elapsed += timeit.default_timer() - start
+            nodes += count[0]
+        best = min(best, 1000 * elapsed)
+    return best, nodes
+
+
+def search_benchmarks(positions, repeat=3, time_limit=SEARCH_TIME_LIMIT):
+    """Run fixed-depth and fixed-time searches on every position. """
+    results = {}
+    score_fn = game_agent.improved_score
+
+    elapsed, nodes = _fixed_depth(
+        lambda: game_agent.MinimaxPlayer(search_depth=MINIMAX_DEPTH, score_fn=score_fn),
+        positions, MINIMAX_DEPTH, False, repeat)
+    prefix = "search/MinimaxPlayer/depth_{}/".format(MINIMAX_DEPTH)
+    results[prefix + "time"] = _result(elapsed, "ms")
+    results[prefix + "nodes"] = _result(nodes, "nodes")
+
+    elapsed, nodes = _fixed_depth(
+        lambda: game_agent.AlphaBetaPlayer(score_fn=score_fn),
+        positions, ALPHABETA_DEPTH, True, repeat)
+    prefix = "search/AlphaBetaPlayer/depth_{}/".format(ALPHABETA_DEPTH)
+    results[prefix + "time"] = _result(elapsed, "ms")
+    results[prefix + "nodes"] = _result(nodes, "nodes")
+
+    total_nodes, total_elapsed, total_depth = 0, 0., 0
+    for moves in positions:
+        player = game_agent.AlphaBetaPlayer(score_fn=score_fn, collect_stats=True)
+        game = _search_board(player, moves)
+        start = timeit.default_timer()
+        player.get_move(game, lambda: time_limit - 1000 * (timeit.default_timer() - start))
+        total_nodes += player.stats.nodes
+        total_elapsed += player.stats.elapsed
+        total_depth += player.stats.depth
+    prefix = "search/AlphaBetaPlayer/time_{}ms/".format(time_limit)
+    results[prefix + "nodes_per_second"] = _result(
+        1000. * total_nodes / total_elapsed, "nodes/s", True)
+    results[prefix + "depth"] = _result(total_depth / len(positions), "plies", True)
+    return results
+
+
+def run_benchmarks(select="*", quick=False):
+    """Run the benchmark suite.
+
+    Parameters
+    ----------
+    select : str (optional)
+        Only run the groups ("board", "heuristic" or "search") matching this
+        `fnmatch` pattern.
+
+    quick : bool (optional)
+        Use fewer positions and shorter measurements (e.g., for tests).
+
+    Returns
+    -------
+    dict
+        The "meta" information of the run and the "results" keyed by
+        benchmark name, each with a value, a unit and whether higher values
+        are better.
+    """
+    positions = benchmark_positions(count=1 if quick else POSITIONS_PER_PLY)
+    repeat, min_time = (1, 0.001) if quick else (5, 0.05)
+    results = {}
+    if fnmatch.fnmatch("board", select):
+        results.update(board_benchmarks(positions, repeat, min_time))
+    if fnmatch.fnmatch("heuristic", select):
+        results.update(heuristic_benchmarks(positions, repeat, min_time))
+    if fnmatch.fnmatch("search", select):
+        results.update(search_benchmarks(positions[:3 if quick else None],
+                                         1 if quick else 3,
+                                         30 if quick else SEARCH_TIME_LIMIT))
+    return {"meta": {"python": platform.python_version(),
+                     "implementation": platform.python_implementation(),
+                     "platform": platform.platform(),
+                     "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                     "positions": len(positions)},
+            "results": results}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, thresholds=None):
+    """Compare benchmark results with a baseline.
+
+    Parameters
+    ----------
+    results, baseline : dict
+        Outputs of `run_benchmarks`. Benchmarks missing from either are
+        skipped.
+
+    threshold : float (optional)
+        The relative change in the wrong direction (e.g., 0.1 for 10%
+        slower) beyond which a result is a regression.
+
+    thresholds : list<(str, float)> (optional)
+        `fnmatch` patterns of benchmark names and their thresholds,
+        overriding `threshold`; the first matching pattern applies.
+
+    Returns
+    -------
+    list<(str, float, float, float)>
+        The name, baseline value, new value and relative change of every
+        regression.
+    """
+    regressions = []
+    for name, result in sorted(results["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None or not base["value"]:
+            continue
+        limit = threshold
+        for pattern, value in thresholds or ():
+            if fnmatch.fnmatch(name, pattern):
+                limit = value
+                break
+        change = (result["value"] - base["value"]) / base["value"]
+        worse = -change if result["higher_is_better"] else change
+        if worse > limit:
+            regressions.append((name, base["value"], result["value"], change))
+    return regressions
+
+
+def _parse_threshold(text):
+    pattern, _, value = text.rpartition("=")
+    if not pattern:
+        raise argparse.ArgumentTypeError("expected PATTERN=FRACTION: {}".format(text))
+    return pattern, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Isolation boards, "
+                                                 "heuristics and search agents.")
+    parser.add_argument("--select", default="*",
+                        help="only run the groups (board, heuristic, search) "
+                             "matching this pattern")
+    parser.add_argument("--quick", action="store_true",
+                        help="fewer positions and shorter measurements")
+    parser.add_argument("--output", default=None,
+                        help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None,
+                        help="compare the results with this JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change that counts as a regression")
+    parser.add_argument("--threshold-for", type=_parse_threshold, action="append",
+                        default=[], metavar="PATTERN=FRACTION",
+                        help="threshold for the benchmarks matching a pattern")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.select, args.quick)
+    for name, result in sorted(results["results"].items()):
+        print("{:<50}{:>14.3f} {}".format(name, result["value"], result["unit"]))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.threshold, args.threshold_for)
+        for name, base, value, change in regressions:
+            print("REGRESSION {}: {:.3f} -> {:.3f} ({:+.1%})".format(
+                name, base, value, change))
+        if regressions:
+            sys.exit(1)
+        print("No regressions against {}".format(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,25 @@ champions) in a tournament.
 
          COMPLETING AND SUBMITTING A COMPETITION AGENT IS OPTIONAL
 """
+import gc
+import math
 import random
 
+from opening_book import OpeningBook
+
+# Rollout policies: uniformly random moves, or the move preferred by the
+# heuristic (with some randomness, see `CustomPlayer`)
+ROLLOUT_RANDOM = "random"
+ROLLOUT_HEURISTIC = "heuristic"
+
+# UCT exploration constant
+EXPLORATION = math.sqrt(2)
+
+# The search stops early by the longest time taken between the end of the
+# search and the return of a move; the longest time decays by this factor
+# on every move so that one slow move does not shorten the rest for good
+CLEANUP_DECAY = 0.9
+
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
@@ -33,7 +50,61 @@ def custom_score(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    raise NotImplementedError
+    if game.is_loser(player):
+        return float("-inf")
+
+    if game.is_winner(player):
+        return float("inf")
+
+    own_moves = len(game.get_legal_moves(player))
+    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    return float(own_moves - 2 * opp_moves)
+
+
+class MCTSNode:
+    """A node of the Monte Carlo search tree.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state at the node.
+
+    move : (int, int) or None
+        The move that led to the node, or None for the root.
+
+    Nodes do not point back to their parents, so the tree has no reference
+    cycles and discarded subtrees are freed without the garbage collector.
+    """
+    __slots__ = ("move", "children", "untried", "key", "ply", "visits", "wins")
+
+    def __init__(self, game, move=None):
+        self.move = move
+        self.children = {}
+        self.untried = None
+        self.key = game.hash()
+        self.ply = game.move_count
+        self.visits = 0
+        # Playouts won by the player who made `move`
+        self.wins = 0
+
+    def select_child(self, exploration):
+        """Return the child with the highest UCT value. """
+        log_visits = math.log(self.visits)
+        best_value, best_child = None, None
+        for child in self.children.values():
+            value = (child.wins / child.visits +
+                     exploration * math.sqrt(log_visits / child.visits))
+            if best_value is None or value > best_value:
+                best_value, best_child = value, child
+        return best_child
+
+    def best_child(self):
+        """Return the most visited child, or None if the node has not been
+        expanded.
+        """
+        if not self.children:
+            return None
+        return max(self.children.values(), key=lambda child: child.visits)
 
 
 class CustomPlayer:
@@ -52,19 +123,72 @@ class CustomPlayer:
     Parameters
     ----------
     data : string
-        The name of the search method to use in get_move().
+        The location of the opening book file (see `opening_book`). The
+        default book is used if None.
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted.  Note that
         the PvP competition uses more accurate timers that are not cross-
         platform compatible, so a limit of 1ms (vs 10ms for the other classes)
-        is generally sufficient.
+        is generally sufficient. The search also stops early by the measured
+        time it takes to choose the move once the search is over (see
+        `cleanup_time`).
+
+    exploration : float (optional)
+        The UCT exploration constant.
+
+    rollout : str (optional)
+        The rollout policy, ROLLOUT_RANDOM or ROLLOUT_HEURISTIC. Heuristic
+        rollouts play the move that maximizes `custom_score` for the moving
+        player, and a random move with probability `rollout_epsilon`.
+
+    rollout_epsilon : float (optional)
+        The probability of a random move in heuristic rollouts.
+
+    reuse_tree : bool (optional)
+        Keep the subtree under the opponent's reply between turns.
+
+    seed : int (optional)
+        The seed of the player's own random number generator, used for
+        rollouts. If None, the global `random` module is used.
     """
 
-    def __init__(self, data=None, timeout=1.):
+    def __init__(self, data=None, timeout=1., exploration=EXPLORATION,
+                 rollout=ROLLOUT_RANDOM, rollout_epsilon=0.1, reuse_tree=True,
+                 seed=None):
         self.score = custom_score
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.opening_book = OpeningBook(data) if data else OpeningBook()
+        self.exploration = exploration
+        self.rollout = rollout
+        self.rollout_epsilon = rollout_epsilon
+        self.reuse_tree = reuse_tree
+        self.rng = random if seed is None else random.Random(seed)
+        self._root = None
+        self._discarded = None
+        # Playouts and elapsed milliseconds of the last search, and the
+        # totals over every search
+        self.playouts = 0
+        self.search_time = 0.
+        self.total_playouts = 0
+        self.total_search_time = 0.
+        # Milliseconds reserved for choosing the move after the search
+        self.cleanup_time = 0.
+
+    @property
+    def playouts_per_second(self):
+        """The playout rate of the last search. """
+        if self.search_time <= 0:
+            return 0.
+        return 1000. * self.playouts / self.search_time
+
+    @property
+    def average_playouts_per_second(self):
+        """The playout rate over every search made by the player. """
+        if self.total_search_time <= 0:
+            return 0.
+        return 1000. * self.total_playouts / self.total_search_time
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -93,5 +217,214 @@ class CustomPlayer:
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        # OPTIONAL: Finish this function!
-        raise NotImplementedError
+        self.time_left = time_left
+        self.playouts, self.search_time = 0, 0.
+
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
+            self._root = None
+            return (-1, -1)
+
+        book_move = self.opening_book.lookup(game)
+        if book_move in legal_moves:
+            self._root = None
+            return book_move
+
+        # Free the unused parts of the previous tree before starting the
+        # clock on the search, rather than after the move is chosen
+        self._discarded = None
+        root = self._find_root(game)
+        self._root = None
+        board = game.copy()
+        # A full garbage collection can pause for longer than the timer
+        # threshold, and the search tree creates no reference cycles. The
+        # collections held back during the search run at the first
+        # allocation after GC is turned back on, so the move is chosen
+        # before that, and the collections happen after the turn is over.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            start = time_left()
+            try:
+                while True:
+                    self.mcts(board, root)
+            except SearchTimeout:
+                pass
+            stop = time_left()
+            self.search_time = start - stop
+            self.total_playouts += self.playouts
+            self.total_search_time += self.search_time
+
+            best = root.best_child()
+            if best is None:
+                self._root = None
+                move = self.rng.choice(legal_moves)
+            else:
+                self._root = best if self.reuse_tree else None
+                self._discarded = root
+                move = best.move
+            self.cleanup_time = max(stop - time_left(),
+                                    CLEANUP_DECAY * self.cleanup_time)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return move
+
+    def mcts(self, game, root):
+        """Run one playout from the root: select a path through the tree with
+        UCT, expand one new node, finish the game with a rollout and update
+        the statistics along the path.
+
+        The game is modified in place with `push()` and restored with `pop()`
+        before returning. The timer is checked before every move of the
+        playout, and an unfinished playout is discarded when it raises
+        SearchTimeout.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state at the root node.
+
+        root : `MCTSNode`
+            The root of the search tree.
+        """
+        node = root
+        path = [root]
+        depth = 0
+        try:
+            # Selection
+            while True:
+                if node.untried is None:
+                    node.untried = game.get_legal_moves()
+                if node.untried or not node.children:
+                    break
+                node = node.select_child(self.exploration)
+                path.append(node)
+                game.push(node.move)
+                depth += 1
+
+            # Expansion; the new node is only linked into the tree once
+            # its playout has finished
+            child = None
+            if node.untried:
+                move = node.untried[-1]
+                game.push(move)
+                depth += 1
+                child = MCTSNode(game, move)
+
+            # Rollout
+            rng = self.rng
+            time_left = self.time_left
+            threshold = self.TIMER_THRESHOLD + self.cleanup_time
+            while True:
+                if time_left() < threshold:
+                    raise SearchTimeout()
+                moves = game.get_legal_moves()
+                if not moves:
+                    break
+                if (self.rollout == ROLLOUT_HEURISTIC and
+                        rng.random() >= self.rollout_epsilon):
+                    move = self._heuristic_move(game, moves)
+                else:
+                    move = moves[int(rng.random() * len(moves))]
+                game.push(move)
+                depth += 1
+
+            # The player to move at the end of the rollout has lost, so the
+            # nodes reached by moves of the other player are wins
+            loser_parity = game.move_count & 1
+        finally:
+            for _ in range(depth):
+                game.pop()
+
+        if child is not None:
+            node.untried.pop()
+            node.children[child.move] = child
+            path.append(child)
+
+        # Backpropagation
+        for node in path:
+            node.visits += 1
+            if node.ply & 1 == loser_parity:
+                node.wins += 1
+        self.playouts += 1
+
+    def _heuristic_move(self, game, moves):
+        """Return the rollout move that maximizes the heuristic value for
+        the active player.
+        """
+        player = game.active_player
+        best_score, best_move = None, moves[0]
+        for move in moves:
+            game.push(move)
+            try:
+                score = self.score(game, player)
+            finally:
+                game.pop()
+            if best_score is None or score > best_score:
+                best_score, best_move = score, move
+        return best_move
+
+    def _find_root(self, game):
+        """Return the node of the previous search tree for the current game
+        state, or a new root if the state was not in the tree.
+        """
+        root = self._root
+        if root is not None and root.key != game.hash():
+            # The tree was rooted after our last move, so the current state
+            # is the child reached by the opponent's reply
+            reply = game.get_player_location(game.inactive_player)
+            root = root.children.get(reply)
+            if root is not None and root.key != game.hash():
+                root = None
+        if root is None:
+            return MCTSNode(game)
+        return root
+
+
+def main():
+    """Compare the MCTS agent with `game_agent.AlphaBetaPlayer` at the same
+    time limit, reporting the playout and node rates of the two searches.
+    """
+    from isolation import BitBoard
+    from game_agent import AlphaBetaPlayer
+
+    time_limit = 150
+    num_games = 10
+
+    class CountingAlphaBetaPlayer(AlphaBetaPlayer):
+        """AlphaBetaPlayer that counts timer checks as searched nodes. """
+        nodes = 0
+        search_time = 0.
+
+        def get_move(self, game, time_left):
+            def counted_time_left():
+                self.nodes += 1
+                return time_left()
+            start = time_left()
+            try:
+                return super().get_move(game, counted_time_left)
+            finally:
+                self.search_time += start - time_left()
+
+    mcts_player = CustomPlayer()
+    alphabeta_player = CountingAlphaBetaPlayer()
+    mcts_wins = 0
+    for game_num in range(num_games):
+        players = [mcts_player, alphabeta_player]
+        if game_num % 2:
+            players.reverse()
+        game = BitBoard(*players)
+        winner, _, _ = game.play(time_limit=time_limit)
+        mcts_wins += winner is mcts_player
+
+    print("MCTS won {} of {} games at {} ms per move".format(
+        mcts_wins, num_games, time_limit))
+    print("MCTS playouts/sec:      {:.0f}".format(
+        mcts_player.average_playouts_per_second))
+    print("Alpha-beta nodes/sec:   {:.0f}".format(
+        1000. * alphabeta_player.nodes / max(alphabeta_player.search_time, 1e-9)))
+
+
+if __name__ == "__main__":
+    main()
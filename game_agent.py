@@ -2,11 +2,51 @@
 test your agent's strength against a set of known agents using tournament.py
 and include the results in your report.
 """
+import multiprocessing
+import queue
 import random
+import timeit
+import weakref
+from collections import OrderedDict
+
+from isolation.endgame import solve_endgame
 
 INFINITY = float("inf")
 NEGATIVE_INFINITY = float("-inf")
 
+# Bound types stored in the transposition table
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+# Transposition table replacement policies
+REPLACE_ALWAYS = "always"
+REPLACE_DEPTH = "depth"
+
+# Move ordering priorities of the transposition table move and killer moves,
+# which are searched before any move ranked by the history heuristic
+HASH_MOVE_PRIORITY = 2**62
+KILLER_PRIORITY = 2**61
+
+# Search modes of AlphaBetaPlayer, and the width of the null window used to
+# test moves in principal variation search
+SEARCH_ALPHABETA = "alphabeta"
+SEARCH_PVS = "pvs"
+NULL_WINDOW = 1e-6
+
+# Longest wait in seconds for the pondering helper to acknowledge a stop
+PONDER_STOP_WAIT = 0.02
+
+# Weights of improved_score, open_move_score and center_score in the
+# GA-trained custom_score_2
+CUSTOM_SCORE_2_WEIGHTS = (5.626514543962844, 2.1318059635578575, -1.20092114580893)
+
+# XORed into the board hash when the searching agent is player 2, since the
+# stored scores are from the point of view of the searching agent
+PLAYER_2_KEY = 0x9e3779b97f4a7c15
+
+# XORed into the board hash by EvaluationCache when the score is requested
+# from the point of view of the active player
+ACTIVE_PLAYER_KEY = 0x6a09e667f3bcc909
+
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
     pass
@@ -37,6 +77,48 @@ def is_game_over(game, player):
         return INFINITY
     return None
 
+def board_features(game, player):
+    """Compute the features used by the composite heuristics in one pass
+    over the board, reading each player's mobility once per evaluation.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : object
+        A player instance in the current game (i.e., an object corresponding to
+        one of the player objects `game.__player_1__` or `game.__player_2__`.)
+
+    Returns
+    -------
+    (float, int, int, float)
+        The terminal value for the player (NEGATIVE_INFINITY if the player has
+        lost, INFINITY if the player has won, None otherwise), the number of
+        legal moves of the player and of its opponent, and the squared
+        distance from the player to the center of the board (as returned by
+        `center_score`). The mobilities and distance are None for terminal
+        states, and the distance is None if the player has not moved.
+    """
+    own_moves = game.mobility(player)
+    opp_moves = game.mobility(game.get_opponent(player))
+
+    # The game is over when the active player cannot move (see
+    # `is_game_over`)
+    if player == game.active_player:
+        if not own_moves:
+            return NEGATIVE_INFINITY, None, None, None
+    elif not opp_moves:
+        return INFINITY, None, None, None
+
+    location = game.get_player_location(player)
+    if location is None:
+        return None, own_moves, opp_moves, None
+    w, h = game.width / 2., game.height / 2.
+    y, x = location
+    return None, own_moves, opp_moves, float((h - y)**2 + (w - x)**2)
+
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -64,19 +146,10 @@ def custom_score(game, player):
 
     #This is the ratio evaluation function.
 
-    score = is_game_over(game, player)
+    score, own_moves, opp_moves, _ = board_features(game, player)
     if score is not None:
         return score
-
-    # Take a ratio between the number of moves you have left versus the
-    # number of moves the opponent has left. If the opponent has no moves left,
-    # then return infinity because you automatically win.
-    opponent = game.get_opponent(player)
-    opponent_moves = len(game.get_legal_moves(opponent))
-    if opponent_moves == 0:
-        return INFINITY
-    else:
-        return float(len(game.get_legal_moves(player))) / len(game.get_legal_moves(opponent))
+    return _ratio_score(own_moves, opp_moves)
 
 def custom_score_2(game, player):
     """Calculate the heuristic value of a game state from the point of view
@@ -103,20 +176,18 @@ def custom_score_2(game, player):
 
     #This is the 3 feature GA-trained evaluation function
 
-    score = is_game_over(game, player)
+    score, own_moves, opp_moves, center = board_features(game, player)
     if score is not None:
         return score
 
     #Weights of each scoring function
-    c1 = 5.626514543962844
-    c2 = 2.1318059635578575
-    c3 = -1.20092114580893
-
-    #Use each of the other scoring heuristics in the proportions according to
-    #c1...c5. Note that some features are deliberately represent two or more
-    #times by the scoring functions. This is done to see whether it would
-    #improve performance.
-    score = (c1*improved_score(game, player)) + (c2*open_move_score(game, player)) + (c3*center_score(game,player))
+    c1, c2, c3 = CUSTOM_SCORE_2_WEIGHTS
+
+    #Combine the features of improved_score, open_move_score and center_score
+    #in the proportions according to c1...c3. Note that some features are
+    #deliberately represented two or more times. This is done to see whether
+    #it would improve performance.
+    score = (c1*float(own_moves - opp_moves)) + (c2*float(own_moves)) + (c3*center)
     return score
 
 def custom_score_3(game, player):
@@ -144,18 +215,18 @@ def custom_score_3(game, player):
 
     #This is the pessimestic evaluation function
 
-    score = is_game_over(game, player)
+    score, own_moves, opp_moves, center = board_features(game, player)
     if score is not None:
         return score
 
     #Get the normalized value for each of the other heuristics, and select
     #the minimum
 
-    #Get the value from each heuristic
-    CS1 = custom_score(game, player)
-    IS = improved_score(game, player)
-    OMS = open_move_score(game, player)
-    CS2 = center_score(game, player)
+    #Get the value of each heuristic from the features
+    CS1 = _ratio_score(own_moves, opp_moves)
+    IS = float(own_moves - opp_moves)
+    OMS = float(own_moves)
+    CS2 = center
 
     #Calculate the maximum for each heuristic
     #For custom_score, it is max_player_move/1
@@ -180,6 +251,15 @@ def custom_score_3(game, player):
     score = min(n_CS1, n_IS, n_OMS, n_CS2)
     return score
 
+def _ratio_score(own_moves, opp_moves):
+    """Take a ratio between the number of moves you have left versus the
+    number of moves the opponent has left. If the opponent has no moves left,
+    then return infinity because you automatically win.
+    """
+    if opp_moves == 0:
+        return INFINITY
+    return float(own_moves) / opp_moves
+
 #The following function was obtained from Udacity
 def improved_score(game, player):
     """The "Improved" evaluation function discussed in lecture that outputs a
@@ -206,8 +286,8 @@ def improved_score(game, player):
     if score is not None:
         return score
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.mobility(player)
+    opp_moves = game.mobility(game.get_opponent(player))
     return float(own_moves - opp_moves)
 
 #The following function was obtained from Udacity
@@ -235,7 +315,7 @@ def open_move_score(game, player):
     if score is not None:
         return score
 
-    return float(len(game.get_legal_moves(player)))
+    return float(game.mobility(player))
 
 #The following function was obtained from Udacity
 def center_score(game, player):
@@ -268,6 +348,280 @@ def center_score(game, player):
     y, x = game.get_player_location(player)
     return float((h - y)**2 + (w - x)**2)
 
+class TranspositionTable:
+    """Bounded transposition table for alpha-beta search, keyed by the
+    Zobrist key of a board (see `isolation.Board.hash()`).
+
+    The table is a fixed array of slots indexed by the low bits of the key,
+    so its memory use never grows past `max_entries` entries (roughly 100
+    bytes each). Each entry is a tuple of (key, depth, bound, score,
+    best_move, generation).
+
+    Parameters
+    ----------
+    max_entries : int (optional)
+        The number of slots in the table.
+
+    replacement : str (optional)
+        The policy used when a new entry maps to an occupied slot:
+        "always" overwrites the slot, and "depth" keeps the existing entry
+        if it was searched deeper during the current move.
+    """
+    def __init__(self, max_entries=2**16, replacement=REPLACE_DEPTH):
+        if replacement not in (REPLACE_ALWAYS, REPLACE_DEPTH):
+            raise ValueError("Unknown replacement policy: {}".format(replacement))
+        self.max_entries = max_entries
+        self.replacement = replacement
+        self.generation = 0
+        self._slots = [None] * max_entries
+
+    def new_search(self):
+        """Mark all stored entries as belonging to an earlier search so that
+        the depth-preferred policy can replace them.
+        """
+        self.generation += 1
+
+    def clear(self):
+        """Remove all entries from the table. """
+        self._slots = [None] * self.max_entries
+
+    def probe(self, key):
+        """Return the entry stored for the key, or None if there is none. """
+        entry = self._slots[key % self.max_entries]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, bound, score, best_move):
+        """Store a search result, subject to the replacement policy.
+
+        Parameters
+        ----------
+        key : int
+            The Zobrist key of the searched position.
+
+        depth : int
+            The remaining search depth of the result.
+
+        bound : int
+            EXACT if score is the exact value of the position, LOWER_BOUND if
+            the search failed high, and UPPER_BOUND if it failed low.
+
+        score : float
+            The search result.
+
+        best_move : (int, int)
+            The best move found in the position.
+        """
+        idx = key % self.max_entries
+        entry = self._slots[idx]
+        if (self.replacement == REPLACE_DEPTH and entry is not None and
+                entry[0] != key and entry[5] == self.generation and
+                entry[1] > depth):
+            return
+        self._slots[idx] = (key, depth, bound, score, best_move, self.generation)
+
+
+class EvaluationCache:
+    """Memoizing wrapper for a score function with a bounded number of
+    entries, e.g. `AlphaBetaPlayer(score_fn=EvaluationCache(custom_score_2))`.
+
+    Scores are keyed by the Zobrist key of the board (see
+    `isolation.Board.hash()`) and whether the perspective player is the
+    active player, which together identify the position and the point of
+    view regardless of which objects are playing. The least recently used
+    entry is evicted when the cache is full, so memory use is bounded by
+    `max_entries` no matter how many games are played.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The score function to cache.
+
+    max_entries : int (optional)
+        The maximum number of cached scores.
+
+    Attributes
+    ----------
+    hits, misses : int
+        The number of calls answered from the cache and computed by the
+        score function.
+    """
+    def __init__(self, score_fn, max_entries=2**16):
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.score_fn = score_fn
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __call__(self, game, player):
+        key = game.hash()
+        if player == game.active_player:
+            key ^= ACTIVE_PLAYER_KEY
+        entries = self._entries
+        score = entries.get(key)
+        if score is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return score
+        score = self.score_fn(game, player)
+        self.misses += 1
+        entries[key] = score
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return score
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        """The fraction of calls answered from the cache. """
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.
+
+    def clear(self):
+        """Remove all entries and reset the counters. """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class SearchStats:
+    """Instrumentation counters for a single get_move() call of a search
+    agent (see the `collect_stats` and `stats_sink` options of
+    `MinimaxPlayer` and `AlphaBetaPlayer`).
+
+    Attributes
+    ----------
+    nodes : int
+        The number of nodes visited, including the root, leaves and nodes
+        answered by the transposition table (counted through the timer
+        check at the top of every node).
+
+    leaf_evaluations : int
+        The number of calls to the evaluation function.
+
+    cutoffs : int
+        The number of alpha and beta cutoffs.
+
+    depth : int
+        The depth of the last completed iteration (0 if none completed).
+
+    iterations : list<(int, int, float)>
+        The depth, number of nodes and elapsed milliseconds of each
+        completed iteration.
+
+    elapsed : float
+        The duration of the whole get_move() call in milliseconds.
+    """
+    def __init__(self):
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.cutoffs = 0
+        self.depth = 0
+        self.iterations = []
+        self.elapsed = 0.
+        self._start = timeit.default_timer()
+        self._iteration_start = (self._start, 0)
+
+    def count_nodes(self, time_left):
+        """Return a timer function that counts a node on every call to
+        `time_left`.
+        """
+        def counting_time_left():
+            self.nodes += 1
+            return time_left()
+        return counting_time_left
+
+    def end_iteration(self, depth):
+        """Record that the iteration of the given depth has completed. """
+        now = timeit.default_timer()
+        start, start_nodes = self._iteration_start
+        self.iterations.append((depth, self.nodes - start_nodes, 1000 * (now - start)))
+        self.depth = depth
+        self._iteration_start = (now, self.nodes)
+
+    def finish(self):
+        """Record the end of the get_move() call. """
+        self.elapsed = 1000 * (timeit.default_timer() - self._start)
+
+    @property
+    def nodes_per_second(self):
+        """The number of nodes visited per second over the whole call. """
+        if self.elapsed <= 0:
+            return 0.
+        return 1000. * self.nodes / self.elapsed
+
+    @property
+    def effective_branching_factor(self):
+        """The ratio between the node counts of the last two completed
+        iterations, or None if fewer than two iterations completed.
+        """
+        if len(self.iterations) < 2 or not self.iterations[-2][1]:
+            return None
+        return self.iterations[-1][1] / self.iterations[-2][1]
+
+    def as_dict(self):
+        """Return the counters as a dict of plain values (e.g., for JSON). """
+        return {"nodes": self.nodes,
+                "leaf_evaluations": self.leaf_evaluations,
+                "cutoffs": self.cutoffs,
+                "depth": self.depth,
+                "iterations": [list(i) for i in self.iterations],
+                "elapsed": self.elapsed,
+                "nodes_per_second": self.nodes_per_second,
+                "effective_branching_factor": self.effective_branching_factor}
+
+
+def _batch_scorer(score_fn):
+    """Return the batched version of a score function (see
+    `batch_eval.batch_scorer`), raising ValueError if there is none.
+    """
+    import batch_eval
+    batch_score = batch_eval.batch_scorer(score_fn)
+    if batch_score is None:
+        raise ValueError("{} has no batched version".format(score_fn))
+    return batch_score
+
+
+def _score_leaves(player, game, legal_moves):
+    """Return the scores of the positions after each of the legal moves,
+    evaluated as a batch, counting them as nodes and leaf evaluations.
+    """
+    if player._stats is not None:
+        player._stats.nodes += len(legal_moves)
+        player._stats.leaf_evaluations += len(legal_moves)
+    return player._batch_score(game, legal_moves, player)
+
+
+def _begin_stats(player, time_left):
+    """Start collecting search statistics for a get_move() call if the
+    player has them enabled, and return the timer function to search with.
+    """
+    if not player.collect_stats and player.stats_sink is None:
+        player._stats = None
+        return time_left
+    player._stats = SearchStats()
+    return player._stats.count_nodes(time_left)
+
+
+def _end_stats(player, move):
+    """Finish the statistics of a get_move() call, publish them on the
+    player and to its sink, and return the move unchanged.
+    """
+    stats = player._stats
+    if stats is not None:
+        player._stats = None
+        stats.finish()
+        player.stats = stats
+        if player.stats_sink is not None:
+            player.stats_sink(stats)
+    return move
+
+
 class IsolationPlayer:
     """Base class for minimax and alphabeta agents -- this class is never
     constructed or tested directly.
@@ -301,7 +655,33 @@ class MinimaxPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using depth-limited minimax
     search. You must finish and test this player to make sure it properly uses
     minimax to return a good move before the search time limit expires.
+
+    Parameters
+    ----------
+    search_depth, score_fn, timeout
+        See `IsolationPlayer`.
+
+    collect_stats : bool (optional)
+        Record a `SearchStats` object for every call to get_move(), which
+        is available as the `stats` attribute after the move.
+
+    stats_sink : callable (optional)
+        Called with the `SearchStats` of every move; setting a sink also
+        enables collection.
+
+    batch_leaves : bool (optional)
+        Evaluate all the leaves below a node at once with NumPy (see
+        `batch_eval`) instead of visiting them one by one. The score
+        function must be one of the heuristics with a batched version.
     """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 collect_stats=False, stats_sink=None, batch_leaves=False):
+        super().__init__(search_depth, score_fn, timeout)
+        self.collect_stats = collect_stats
+        self.stats_sink = stats_sink
+        self.stats = None
+        self._stats = None
+        self._batch_score = _batch_scorer(score_fn) if batch_leaves else None
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -331,7 +711,7 @@ class MinimaxPlayer(IsolationPlayer):
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        self.time_left = time_left
+        self.time_left = _begin_stats(self, time_left)
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
@@ -340,13 +720,15 @@ class MinimaxPlayer(IsolationPlayer):
         try:
             # The try/except block will automatically catch the exception
             # raised when the timer is about to expire.
-            return self.minimax(game, self.search_depth)
+            best_move = self.minimax(game, self.search_depth)
+            if self._stats is not None:
+                self._stats.end_iteration(self.search_depth)
 
         except SearchTimeout:
             pass  # Handle any actions required after timeout as needed
 
         # Return the best move from the last completed search iteration
-        return best_move
+        return _end_stats(self, best_move)
 
     def minimax(self, game, depth):
         """Implement depth-limited minimax search algorithm as described in
@@ -395,7 +777,11 @@ class MinimaxPlayer(IsolationPlayer):
         value = NEGATIVE_INFINITY
         best_move = (-1, -1)
         for move in legal_moves:
-            v = self.minValue(game.forecast_move(move), depth)
+            game.push(move)
+            try:
+                v = self.minValue(game, depth)
+            finally:
+                game.pop()
             if v > value:
                 value = v
                 best_move = move
@@ -411,11 +797,20 @@ class MinimaxPlayer(IsolationPlayer):
         legal_moves = game.get_legal_moves()
 
         if (depth == 1) or not legal_moves:
+            if self._stats is not None:
+                self._stats.leaf_evaluations += 1
             return self.score(game, self)
 
+        if depth == 2 and self._batch_score is not None and game.move_count:
+            return min(_score_leaves(self, game, legal_moves))
+
         v = INFINITY
         for move in legal_moves:
-            v = min(v, self.maxValue(game.forecast_move(move), depth-1))
+            game.push(move)
+            try:
+                v = min(v, self.maxValue(game, depth-1))
+            finally:
+                game.pop()
         return v
 
     def maxValue(self, game, depth):
@@ -424,19 +819,196 @@ class MinimaxPlayer(IsolationPlayer):
 
         legal_moves = game.get_legal_moves()
         if (depth == 1) or not legal_moves:
+            if self._stats is not None:
+                self._stats.leaf_evaluations += 1
             return self.score(game, self)
 
+        if depth == 2 and self._batch_score is not None and game.move_count:
+            return max(_score_leaves(self, game, legal_moves))
+
         v = NEGATIVE_INFINITY
         for move in legal_moves:
-            v = max(v, self.minValue(game.forecast_move(move), depth-1))
+            game.push(move)
+            try:
+                v = max(v, self.minValue(game, depth-1))
+            finally:
+                game.pop()
         return v
 
 
+def _ponder_worker(tasks, reports, active, score_fn, timeout, use_table,
+                   move_ordering, search_mode, endgame_solver):
+    """Pondering helper process: for every (ponder id, board description,
+    deadline) read from `tasks`, run iterative deepening over each reply
+    available to the opponent until the deadline or until `active` no
+    longer holds the ponder id, reporting every completed reply search as
+    (ponder id, salted hash of the position after the reply,
+    (depth, move, score)) on `reports`, followed by (ponder id, None, None)
+    when the ponder ends.
+    """
+    from lazy_smp import restore_board
+
+    player = AlphaBetaPlayer(score_fn=score_fn, timeout=timeout,
+                             tt_entries=2**16 if use_table else 0,
+                             move_ordering=move_ordering, search_mode=search_mode,
+                             endgame_solver=endgame_solver)
+    for ponder_id, description, deadline in iter(tasks.get, None):
+        game = restore_board(description, player)
+
+        def time_left():
+            if active.value != ponder_id:
+                return NEGATIVE_INFINITY
+            return 1000 * (deadline - timeit.default_timer())
+
+        player.time_left = time_left
+        player._killers = {}
+        if player.transposition_table is not None:
+            player.transposition_table.new_search()
+        replies = game.get_legal_moves()
+        if player.transposition_table is not None:
+            entry = player.transposition_table.probe(game.hash() ^ player._seat_salt(game))
+            if entry is not None and entry[4] in replies:
+                replies.remove(entry[4])
+                replies.insert(0, entry[4])
+
+        try:
+            for depth in range(1, len(game.get_blank_spaces()) + 1):
+                for reply in replies:
+                    game.push(reply)
+                    try:
+                        move = player.alphabeta(game, depth)
+                        key = game.hash() ^ player._tt_salt
+                    finally:
+                        game.pop()
+                    reports.put((ponder_id, key, (depth, move, player._root_score)))
+        except SearchTimeout:
+            pass
+        reports.put((ponder_id, None, None))
+
+
+def _stop_ponder_process(process, tasks):
+    """Stop a pondering helper process. """
+    tasks.put(None)
+    process.join(timeout=1)
+    if process.is_alive():
+        process.terminate()
+
+
 class AlphaBetaPlayer(IsolationPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    Parameters
+    ----------
+    search_depth, score_fn, timeout
+        See `IsolationPlayer`.
+
+    tt_entries : int (optional)
+        The number of slots in the transposition table that is shared by
+        the iterations of iterative deepening and kept between moves. Use
+        0 to search without a transposition table.
+
+    tt_replacement : str (optional)
+        The replacement policy of the transposition table (see
+        `TranspositionTable`).
+
+    move_ordering : bool (optional)
+        Search the best move of the previous iteration first, followed by
+        killer moves and moves ranked by the history heuristic. Nodes
+        without any of this information are ordered by the number of
+        onward moves from each destination.
+
+    search_mode : str (optional)
+        "alphabeta" searches every child with the full window; "pvs"
+        (principal variation search) searches the first child with the full
+        window and the others with a null window, re-searching a child only
+        if it turns out to be better than the first.
+
+    aspiration_window : float (optional)
+        If set, each iteration of iterative deepening after the first is
+        searched with a window of this half-width around the score of the
+        previous iteration, and re-searched with an open bound on the side
+        that fails.
+
+    ponder : bool (optional)
+        Keep searching in a helper process while the opponent is thinking
+        about its reply. Each possible reply is deepened in turn (the reply
+        predicted by the helper's transposition table first), and when the
+        opponent plays one of them the next search resumes from the deepest
+        completed result. Pondering stops as soon as get_move() is called
+        again, and otherwise after as long as this agent's own last turn
+        (the opponent's time limit is assumed to be the same), so it never
+        outlives the opponent's turn or the end of the game by more than
+        that. The helper runs in its own process so that it does not hold
+        the interpreter lock while the opponent is searching; it only costs
+        the opponent time if both share a single core. The helper process is
+        started on the first ponder and stopped by close() or when the
+        player is garbage collected.
+
+    endgame_solver : bool (optional)
+        Solve positions where the players can no longer reach each other's
+        regions exactly (see `isolation.endgame`), both at the root, where
+        the move is then played without searching, and at interior nodes.
+
+    opening_book : object (optional)
+        An object with a lookup(game) method that returns a move for the
+        active player or None, such as `opening_book.OpeningBook`. Book
+        moves are played without searching.
+
+    collect_stats, stats_sink
+        See `MinimaxPlayer`. Pondering is not included in the statistics.
+
+    batch_leaves : bool (optional)
+        See `MinimaxPlayer`. The batch is evaluated in the move order of the
+        node, and the cutoff is applied to the batched scores.
     """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 tt_entries=2**16, tt_replacement=REPLACE_DEPTH,
+                 move_ordering=True, search_mode=SEARCH_ALPHABETA,
+                 aspiration_window=None, ponder=False, endgame_solver=True,
+                 opening_book=None, collect_stats=False, stats_sink=None,
+                 batch_leaves=False):
+        super().__init__(search_depth, score_fn, timeout)
+        if search_mode not in (SEARCH_ALPHABETA, SEARCH_PVS):
+            raise ValueError("Unknown search mode: {}".format(search_mode))
+        self.transposition_table = None
+        if tt_entries:
+            self.transposition_table = TranspositionTable(tt_entries, tt_replacement)
+        self.move_ordering = move_ordering
+        self.search_mode = search_mode
+        self.aspiration_window = aspiration_window
+        self.endgame_solver = endgame_solver
+        self.opening_book = opening_book
+        self.collect_stats = collect_stats
+        self.stats_sink = stats_sink
+        self.stats = None
+        self._stats = None
+        self._batch_score = _batch_scorer(score_fn) if batch_leaves else None
+        self._tt_salt = 0
+        self._root_score = None
+        # Depth of the last iteration completed by get_move(), or None if
+        # the move was chosen without a search (opening book or endgame)
+        self._completed_depth = 0
+
+        # Background search on the opponent's turn; the results map the
+        # salted hash of each position after a reply to (depth, move, score)
+        self.ponder = ponder
+        self._ponder_process = None
+        self._describe_board = None
+        self._ponder_tasks = None
+        self._ponder_reports = None
+        self._ponder_active = None
+        self._ponder_id = 0
+        self._pondering = False
+        self._ponder_results = {}
+        self._turn_time = 0.
+        self._finalizer = None
+
+        # Killer moves indexed by game.move_count, and history heuristic
+        # scores indexed by destination cell
+        self._killers = {}
+        self._history = {}
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -468,8 +1040,19 @@ class AlphaBetaPlayer(IsolationPlayer):
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        self.time_left = time_left
-
+        self._stop_pondering()
+        if self.ponder:
+            # Starting the helper takes a few milliseconds, so it is done
+            # before the search rather than after choosing the move
+            self._start_ponder_process()
+        self._turn_time = time_left()
+        self.time_left = _begin_stats(self, time_left)
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        self._killers = {}
+        for move in self._history:
+            self._history[move] //= 2
+        self._completed_depth = 0
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
@@ -478,16 +1061,52 @@ class AlphaBetaPlayer(IsolationPlayer):
             best_move = legal_moves[0]
         else:
             best_move = (-1, -1)
-        max_int = 2**63
+
+        if self.opening_book is not None and legal_moves:
+            book_move = self.opening_book.lookup(game)
+            if book_move in legal_moves:
+                self._completed_depth = None
+                return _end_stats(self, book_move)
+
+        # Separated endgames are solved exactly, so there is nothing to search
+        if self.endgame_solver and legal_moves:
+            solution = solve_endgame(game)
+            if solution is not None and solution[1] in legal_moves:
+                self._completed_depth = None
+                return _end_stats(self, solution[1])
+
+        # Every ply blocks a blank cell, so deeper searches than this would
+        # only repeat the last one
+        max_depth = len(game.get_blank_spaces())
+
+        # Resume from the pondering result if the opponent played a reply
+        # that was searched on its turn
+        start_depth = 1
+        result = self._ponder_results.get(game.hash() ^ self._seat_salt(game))
+        if result is not None and result[1] in legal_moves:
+            self._completed_depth, best_move, self._root_score = result
+            start_depth = self._completed_depth + 1
+        self._ponder_results = {}
+
         try:
             # The try/except block will automatically catch the exception
             # raised when the timer is about to expire.
-            for depth in range(max_int):
-                best_move = self.alphabeta(game, depth)
+            for depth in range(start_depth, max_depth + 1):
+                if self.aspiration_window is None or depth == 1:
+                    best_move = self.alphabeta(game, depth)
+                else:
+                    best_move = self._aspiration_search(game, depth)
+                self._completed_depth = depth
+                if self._stats is not None:
+                    self._stats.end_iteration(depth)
 
         except SearchTimeout:
             pass  # Handle any actions required after timeout as needed
 
+        _end_stats(self, best_move)
+        if self.ponder and best_move in legal_moves:
+            self._start_pondering(game, best_move)
+
         # Return the best move from the last completed search iteration
         return best_move
 
@@ -539,55 +1158,334 @@ class AlphaBetaPlayer(IsolationPlayer):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
+        self._tt_salt = self._seat_salt(game)
+
         legal_moves = game.get_legal_moves()
+        if self.move_ordering and self.transposition_table is not None:
+            entry = self.transposition_table.probe(game.hash() ^ self._tt_salt)
+            hash_move = entry[4] if entry is not None else None
+            legal_moves = self._order_moves(game, legal_moves, hash_move)
 
         value = NEGATIVE_INFINITY
+        alpha_orig = alpha
 
         if len(legal_moves) > 0:
             best_move = legal_moves[0]
         else:
             best_move = (-1, -1)
 
-        for move in legal_moves:
-            v = self.minValue(game.forecast_move(move), alpha, beta, depth)
+        pvs = self.search_mode == SEARCH_PVS
+        for i, move in enumerate(legal_moves):
+            game.push(move)
+            try:
+                if pvs and i > 0 and alpha > NEGATIVE_INFINITY:
+                    v = self.minValue(game, alpha, alpha + NULL_WINDOW, depth)
+                    if alpha < v < beta:
+                        v = self.minValue(game, alpha, beta, depth)
+                else:
+                    v = self.minValue(game, alpha, beta, depth)
+            finally:
+                game.pop()
             if v > value:
                 value = v
                 best_move = move
             if v >= beta:
-                return move
+                if self._stats is not None:
+                    self._stats.cutoffs += 1
+                break
             alpha = max(alpha, v)
+
+        self._root_score = value
+        if self.transposition_table is not None and legal_moves:
+            self._tt_store(game.hash() ^ self._tt_salt, depth + 1,
+                           alpha_orig, beta, value, best_move)
         return best_move
 
     def maxValue(self, game, alpha, beta, depth):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
+        use_tt = self.transposition_table is not None and depth > 1
+        if use_tt:
+            key = game.hash() ^ self._tt_salt
+            score, hash_move = self._tt_probe(key, alpha, beta, depth)
+            if score is not None:
+                return score
+        else:
+            hash_move = None
+
+        if self.endgame_solver and depth > 2:
+            solution = solve_endgame(game)
+            if solution is not None:
+                return INFINITY if solution[0] == self else NEGATIVE_INFINITY
+
         legal_moves = game.get_legal_moves()
 
         if (depth ==1) or not legal_moves:
+            if self._stats is not None:
+                self._stats.leaf_evaluations += 1
             return self.score(game, self)
 
+        if self.move_ordering:
+            legal_moves = self._order_moves(game, legal_moves, hash_move)
+
+        leaf_scores = None
+        if depth == 2 and self._batch_score is not None and game.move_count:
+            leaf_scores = _score_leaves(self, game, legal_moves)
+
+        alpha_orig = alpha
         v = NEGATIVE_INFINITY
-        for move in legal_moves:
-            v = max(v, self.minValue(game.forecast_move(move), alpha, beta, depth - 1))
+        best_move = legal_moves[0]
+        pvs = self.search_mode == SEARCH_PVS
+        for i, move in enumerate(legal_moves):
+            if leaf_scores is not None:
+                child_v = leaf_scores[i]
+            else:
+                game.push(move)
+                try:
+                    if pvs and i > 0 and alpha > NEGATIVE_INFINITY:
+                        # Prove that the move is no better than alpha with a
+                        # null window, and re-search only if the proof fails
+                        child_v = self.minValue(game, alpha, alpha + NULL_WINDOW, depth - 1)
+                        if alpha < child_v < beta:
+                            child_v = self.minValue(game, alpha, beta, depth - 1)
+                    else:
+                        child_v = self.minValue(game, alpha, beta, depth - 1)
+                finally:
+                    game.pop()
+            if child_v > v:
+                v = child_v
+                best_move = move
             if v >= beta:
-                return v
+                if self._stats is not None:
+                    self._stats.cutoffs += 1
+                if self.move_ordering:
+                    self._record_cutoff(game, move, depth)
+                break
             alpha = max(alpha, v)
+
+        if use_tt:
+            self._tt_store(key, depth, alpha_orig, beta, v, best_move)
         return v
 
     def minValue(self, game, alpha, beta, depth):
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
 
+        use_tt = self.transposition_table is not None and depth > 1
+        if use_tt:
+            key = game.hash() ^ self._tt_salt
+            score, hash_move = self._tt_probe(key, alpha, beta, depth)
+            if score is not None:
+                return score
+        else:
+            hash_move = None
+
+        if self.endgame_solver and depth > 2:
+            solution = solve_endgame(game)
+            if solution is not None:
+                return INFINITY if solution[0] == self else NEGATIVE_INFINITY
+
         legal_moves = game.get_legal_moves()
 
         if (depth == 1) or not legal_moves:
+            if self._stats is not None:
+                self._stats.leaf_evaluations += 1
             return self.score(game, self)
 
+        if self.move_ordering:
+            legal_moves = self._order_moves(game, legal_moves, hash_move)
+
+        leaf_scores = None
+        if depth == 2 and self._batch_score is not None and game.move_count:
+            leaf_scores = _score_leaves(self, game, legal_moves)
+
+        beta_orig = beta
         v = INFINITY
-        for move in legal_moves:
-            v = min(v, self.maxValue(game.forecast_move(move), alpha, beta, depth - 1))
+        best_move = legal_moves[0]
+        pvs = self.search_mode == SEARCH_PVS
+        for i, move in enumerate(legal_moves):
+            if leaf_scores is not None:
+                child_v = leaf_scores[i]
+            else:
+                game.push(move)
+                try:
+                    if pvs and i > 0 and beta < INFINITY:
+                        child_v = self.maxValue(game, beta - NULL_WINDOW, beta, depth - 1)
+                        if alpha < child_v < beta:
+                            child_v = self.maxValue(game, alpha, beta, depth - 1)
+                    else:
+                        child_v = self.maxValue(game, alpha, beta, depth - 1)
+                finally:
+                    game.pop()
+            if child_v < v:
+                v = child_v
+                best_move = move
             if v <= alpha:
-                return v
+                if self._stats is not None:
+                    self._stats.cutoffs += 1
+                if self.move_ordering:
+                    self._record_cutoff(game, move, depth)
+                break
             beta = min(beta, v)
-        return v
\ No newline at end of file
+
+        if use_tt:
+            self._tt_store(key, depth, alpha, beta_orig, v, best_move)
+        return v
+
+    def _seat_salt(self, game):
+        """Return the key XORed into board hashes while searching as the
+        player in the given game. Scores are stored from this agent's point
+        of view, so the entries for each seat are kept apart.
+        """
+        is_player_1 = (game.active_player == self) == (game.move_count % 2 == 0)
+        return 0 if is_player_1 else PLAYER_2_KEY
+
+    def close(self):
+        """Stop the pondering helper process, if it is running. """
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def _start_pondering(self, game, move):
+        """Start searching the replies to our move in the helper process,
+        until the next call to get_move() or for as long as our own turn.
+        """
+        board = game.copy()
+        board.apply_move(move)
+        if not board.get_legal_moves():
+            return  # the game is over
+        self._ponder_id += 1
+        self._ponder_active.value = self._ponder_id
+        deadline = timeit.default_timer() + self._turn_time / 1000.
+        self._ponder_tasks.put((self._ponder_id, self._describe_board(board, self),
+                                deadline))
+        self._pondering = True
+
+    def _start_ponder_process(self):
+        """Start the pondering helper process if it is not running yet. """
+        if self._ponder_process is None:
+            from lazy_smp import describe_board
+            self._describe_board = describe_board
+            self._ponder_tasks = multiprocessing.Queue()
+            self._ponder_reports = multiprocessing.Queue()
+            self._ponder_active = multiprocessing.RawValue("q", 0)
+            self._ponder_process = multiprocessing.Process(
+                target=_ponder_worker, daemon=True,
+                args=(self._ponder_tasks, self._ponder_reports, self._ponder_active,
+                      self.score, self.TIMER_THRESHOLD,
+                      self.transposition_table is not None, self.move_ordering,
+                      self.search_mode, self.endgame_solver))
+            self._ponder_process.start()
+            self._finalizer = weakref.finalize(
+                self, _stop_ponder_process, self._ponder_process, self._ponder_tasks)
+
+    def _stop_pondering(self):
+        """Stop pondering, if the helper is pondering, and collect the
+        results it has reported for the current ponder.
+        """
+        if not self._pondering:
+            return
+        self._pondering = False
+        self._ponder_active.value = 0
+        # The helper stops within one node, so its reports end shortly
+        deadline = timeit.default_timer() + PONDER_STOP_WAIT
+        results = {}
+        while True:
+            try:
+                ponder_id, key, result = self._ponder_reports.get(
+                    timeout=max(deadline - timeit.default_timer(), 0))
+            except queue.Empty:
+                break
+            if ponder_id != self._ponder_id:
+                continue
+            if key is None:
+                break
+            results[key] = result
+        self._ponder_results = results
+
+    def _aspiration_search(self, game, depth):
+        """Search the root with a narrow window around the score of the
+        previous iteration, opening the window on the side that fails.
+        """
+        guess = self._root_score
+        if guess is None or guess in (INFINITY, NEGATIVE_INFINITY):
+            return self.alphabeta(game, depth)
+
+        alpha = guess - self.aspiration_window
+        beta = guess + self.aspiration_window
+        while True:
+            best_move = self.alphabeta(game, depth, alpha, beta)
+            if self._root_score <= alpha and alpha > NEGATIVE_INFINITY:
+                alpha = NEGATIVE_INFINITY
+            elif self._root_score >= beta and beta < INFINITY:
+                beta = INFINITY
+            else:
+                return best_move
+
+    def _tt_probe(self, key, alpha, beta, depth):
+        """Look up the key in the transposition table.
+
+        Returns
+        -------
+        (float, (int, int))
+            The stored score if the entry was searched at least `depth` plies
+            and decides the node for the (alpha, beta) window (otherwise
+            None), and the stored best move (None if there is no entry).
+        """
+        entry = self.transposition_table.probe(key)
+        if entry is None:
+            return None, None
+        bound, score, best_move = entry[2], entry[3], entry[4]
+        if entry[1] >= depth and (
+                bound == EXACT or
+                (bound == LOWER_BOUND and score >= beta) or
+                (bound == UPPER_BOUND and score <= alpha)):
+            return score, best_move
+        return None, best_move
+
+    def _tt_store(self, key, depth, alpha, beta, score, best_move):
+        """Store a search result in the transposition table, classifying it
+        by the (alpha, beta) window the node was searched with.
+        """
+        if score <= alpha:
+            bound = UPPER_BOUND
+        elif score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        self.transposition_table.store(key, depth, bound, score, best_move)
+
+    def _order_moves(self, game, legal_moves, hash_move):
+        """Sort the legal moves of a node so that the moves most likely to
+        cause a cutoff are searched first: the best move from the previous
+        iteration, then killer moves, then moves by history score.
+        """
+        if len(legal_moves) < 2:
+            return legal_moves
+        killers = self._killers.get(game.move_count, ())
+        history = self._history
+
+        if hash_move is None and not killers:
+            # First visit to this node: fall back on the static ordering,
+            # which tries the destinations with the most onward moves first
+            legal_moves.sort(key=lambda m: -game.degree(m))
+
+        def priority(move):
+            if move == hash_move:
+                return HASH_MOVE_PRIORITY
+            if move in killers:
+                return KILLER_PRIORITY
+            return history.get(move, 0)
+
+        legal_moves.sort(key=priority, reverse=True)
+        return legal_moves
+
+    def _record_cutoff(self, game, move, depth):
+        """Update the killer moves and the history table after the move
+        caused a cutoff at a node with `depth` plies left to search.
+        """
+        killers = self._killers.setdefault(game.move_count, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self._history[move] = self._history.get(move, 0) + depth * depth
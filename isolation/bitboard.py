@@ -0,0 +1,320 @@
+"""
+This file contains the `BitBoard` class, a drop-in replacement for the
+`isolation.Board` class that stores the blocked cells of the game in a single
+integer bitmask and generates knight moves from masks that are precomputed
+once for each (width, height) board size.
+
+Cells are numbered the same way as in `Board` (index = row + column * height),
+so bit `i` of the mask corresponds to entry `i` of `Board._board_state`.
+"""
+import random
+
+from .isolation import Board, canonical_key, zobrist_keys
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+# Cache of (knight_masks, cells) tuples keyed by (width, height)
+_BOARD_TABLES = {}
+
+
+def board_tables(width, height):
+    """Return the precomputed lookup tables for a board of the given size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    Returns
+    -------
+    (tuple<int>, tuple<(int, int)>)
+        The knight-move bitmask of every cell index, and the (row, column)
+        coordinate pair of every cell index.
+    """
+    key = (width, height)
+    tables = _BOARD_TABLES.get(key)
+    if tables is None:
+        cells = tuple((idx % height, idx // height)
+                      for idx in range(width * height))
+        masks = []
+        for r, c in cells:
+            mask = 0
+            for dr, dc in DIRECTIONS:
+                if 0 <= r + dr < height and 0 <= c + dc < width:
+                    mask |= 1 << (r + dr + (c + dc) * height)
+            masks.append(mask)
+        tables = _BOARD_TABLES[key] = (tuple(masks), cells)
+    return tables
+
+
+class BitBoard(Board):
+    """Implement a model for the game Isolation with the same interface as
+    `isolation.Board`, using an integer bitmask for the blocked cells.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+
+    seed : int (optional)
+        The seed of the board's own random number generator, which orders
+        the moves returned by get_legal_moves(); copies of the board share
+        the generator. If None, the global `random` module is used.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7, seed=None):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        # Blocked cells, and the cell index of each player's last move
+        self._blocked = 0
+        self._p1_loc = Board.NOT_MOVED
+        self._p2_loc = Board.NOT_MOVED
+        self._masks, self._cells = board_tables(width, height)
+
+        # (cell index, previous location, previous Zobrist key) of every
+        # move applied by push()
+        self._undo_stack = []
+
+        # Zobrist key of the current state (see `isolation.Board.zobrist`)
+        self._zobrist = 0
+        (self._cell_keys, self._p1_keys, self._p2_keys,
+         self._side_key) = zobrist_keys(width, height)
+
+        self._rng = random if seed is None else random.Random(seed)
+
+    @property
+    def _board_state(self):
+        """The game state in the list layout used by `isolation.Board`. This
+        is rebuilt on every access and is only provided for compatibility.
+        """
+        size = self.width * self.height
+        state = [(self._blocked >> idx) & 1 for idx in range(size)]
+        state += [self.move_count & 1, self._p2_loc, self._p1_loc]
+        return state
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = object.__new__(self.__class__)
+        new_board.__dict__.update(self.__dict__)
+        new_board._undo_stack = self._undo_stack[:]
+        return new_board
+
+    def canonical_hash(self):
+        """Return the Zobrist key of the canonical form of the current state
+        and the transform that maps the board onto it (see
+        `isolation.Board.canonical_hash`).
+        """
+        blocked = []
+        mask = self._blocked
+        while mask:
+            low = mask & -mask
+            blocked.append(low.bit_length() - 1)
+            mask ^= low
+        return canonical_key(self.width, self.height, blocked,
+                             self._p1_loc, self._p2_loc,
+                             self._side_key if self.move_count & 1 else 0)
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        r, c = move
+        return (0 <= r < self.height and 0 <= c < self.width and
+                not (self._blocked >> (r + c * self.height)) & 1)
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        return self.__cells_in(~self._blocked & ((1 << len(self._cells)) - 1))
+
+    def get_player_location(self, player):
+        """Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int) or None
+            The coordinate pair (row, column) of the input player, or None
+            if the player has not moved.
+        """
+        idx = self.__location_index(player)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._cells[idx]
+
+    def get_legal_moves(self, player=None):
+        """Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        -------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self._active_player
+        idx = self.__location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        valid_moves = self.__cells_in(self._masks[idx] & ~self._blocked)
+        self._rng.shuffle(valid_moves)
+        return valid_moves
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        key = self._zobrist ^ self._cell_keys[idx] ^ self._side_key
+        if self._active_player == self._player_2:
+            if self._p2_loc != Board.NOT_MOVED:
+                key ^= self._p2_keys[self._p2_loc]
+            self._p2_loc = idx
+            key ^= self._p2_keys[idx]
+        else:
+            if self._p1_loc != Board.NOT_MOVED:
+                key ^= self._p1_keys[self._p1_loc]
+            self._p1_loc = idx
+            key ^= self._p1_keys[idx]
+        self._zobrist = key
+        self._blocked |= 1 << idx
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+
+    def push(self, move):
+        """Apply a move to the board in-place and remember how to revert it
+        with `pop()` (see `isolation.Board.push`).
+        """
+        if self._active_player == self._player_2:
+            last_loc = self._p2_loc
+        else:
+            last_loc = self._p1_loc
+        self._undo_stack.append((move[0] + move[1] * self.height, last_loc,
+                                 self._zobrist))
+        self.apply_move(move)
+
+    def pop(self):
+        """Revert the last move applied with `push()`. """
+        idx, last_loc, self._zobrist = self._undo_stack.pop()
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+        if self._active_player == self._player_2:
+            self._p2_loc = last_loc
+        else:
+            self._p1_loc = last_loc
+        self._blocked ^= 1 << idx
+
+    def mobility(self, player=None):
+        """Return the number of legal moves of the specified player, without
+        building the list of moves (see `isolation.Board.mobility`).
+        """
+        if player is None:
+            player = self._active_player
+        idx = self.__location_index(player)
+        if idx == Board.NOT_MOVED:
+            return len(self._cells) - bin(self._blocked).count("1")
+        return bin(self._masks[idx] & ~self._blocked).count("1")
+
+    def degree(self, cell):
+        """Return the number of open cells one knight move away from a cell
+        (see `isolation.Board.degree`).
+        """
+        return bin(self._masks[cell[0] + cell[1] * self.height] & ~self._blocked).count("1")
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self._inactive_player and not self.__has_moves()
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self._active_player and not self.__has_moves()
+
+    def utility(self, player):
+        """Returns the utility of the current game state from the perspective
+        of the specified player (see `isolation.Board.utility`).
+        """
+        if not self.__has_moves():
+
+            if player == self._inactive_player:
+                return float("inf")
+
+            if player == self._active_player:
+                return float("-inf")
+
+        return 0.
+
+    def __has_moves(self):
+        """Test whether the active player has at least one legal move without
+        building the list of moves.
+        """
+        idx = self.__location_index(self._active_player)
+        if idx == Board.NOT_MOVED:
+            return self._blocked != (1 << len(self._cells)) - 1
+        return bool(self._masks[idx] & ~self._blocked)
+
+    def __location_index(self, player):
+        """Return the cell index of the last move of the specified player. """
+        if player == self._player_1:
+            return self._p1_loc
+        elif player == self._player_2:
+            return self._p2_loc
+        raise RuntimeError(
+            "Invalid player in get_player_location: {}".format(player))
+
+    def __cells_in(self, mask):
+        """Convert a bitmask of cell indices to a list of (row, column) pairs
+        in ascending index order.
+        """
+        cells = self._cells
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(cells[low.bit_length() - 1])
+            mask ^= low
+        return out
@@ -0,0 +1,157 @@
+"""
+This file contains an exact solver for separated Isolation endgames. Once the
+cells reachable by the two players no longer overlap, neither player can
+affect the other, and the game is decided by which player can make the
+longer knight's path through its own region.
+
+Regions are represented as bitmasks of cell indices (index = row + column *
+height, as in `isolation.Board`), and the longest path from each (cell,
+region) pair is memoized so that repeated probes during search are cheap.
+"""
+from .bitboard import BitBoard, board_tables
+
+# Regions with more cells than this are not solved, because the longest
+# path search is exponential in the size of the region
+MAX_REGION_CELLS = 16
+
+# Memoized longest path lengths keyed by (width, height), then by
+# (start cell index, free cell mask); cleared when it grows past the limit
+_LONGEST_PATHS = {}
+_MAX_MEMO_ENTRIES = 2**18
+
+
+def _blank_mask(game):
+    """Return the bitmask of the blank cells on the board. """
+    if isinstance(game, BitBoard):
+        return ~game._blocked & ((1 << (game.width * game.height)) - 1)
+    mask = 0
+    for r, c in game.get_blank_spaces():
+        mask |= 1 << (r + c * game.height)
+    return mask
+
+
+def _flood_fill(masks, start, free, limit=None):
+    """Return the bitmask of the free cells reachable by knight moves from
+    the start cell index (not including the start cell itself). If the
+    region grows past `limit` cells, stop and return None.
+    """
+    region = 0
+    frontier = masks[start] & free
+    while frontier:
+        region |= frontier
+        if limit is not None and bin(region).count("1") > limit:
+            return None
+        spread = 0
+        while frontier:
+            low = frontier & -frontier
+            spread |= masks[low.bit_length() - 1]
+            frontier ^= low
+        frontier = spread & free & ~region
+    return region
+
+
+def _longest_path(masks, memo, start, free):
+    """Return the number of moves in the longest knight's path from the
+    start cell index that only visits free cells.
+    """
+    key = (start, free)
+    length = memo.get(key)
+    if length is not None:
+        return length
+
+    length = 0
+    limit = bin(free).count("1")
+    options = masks[start] & free
+    while options and length < limit:
+        low = options & -options
+        length = max(length, 1 + _longest_path(masks, memo, low.bit_length() - 1, free ^ low))
+        options ^= low
+    memo[key] = length
+    return length
+
+
+def player_region(game, player):
+    """Return the bitmask of the blank cells that the player can still reach
+    with any sequence of knight moves, or None if the player has not moved.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : object
+        A player registered in the current game.
+
+    Returns
+    -------
+    int or None
+        The bitmask of reachable cell indices.
+    """
+    loc = game.get_player_location(player)
+    if loc is None:
+        return None
+    masks, _ = board_tables(game.width, game.height)
+    return _flood_fill(masks, loc[0] + loc[1] * game.height, _blank_mask(game))
+
+
+def is_partitioned(game):
+    """Test whether the regions reachable by the two players are disjoint.
+    """
+    region_1 = player_region(game, game.active_player)
+    region_2 = player_region(game, game.inactive_player)
+    return region_1 is not None and region_2 is not None and not region_1 & region_2
+
+
+def solve_endgame(game):
+    """Solve a separated endgame exactly.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    Returns
+    -------
+    (object, (int, int)) or None
+        The winning player and the first move of the longest path available
+        to the active player (None if it has no moves), or None if the
+        players are not separated or a region is too large to solve.
+    """
+    loc_1 = game.get_player_location(game.active_player)
+    loc_2 = game.get_player_location(game.inactive_player)
+    if loc_1 is None or loc_2 is None:
+        return None
+
+    masks, cells = board_tables(game.width, game.height)
+    free = _blank_mask(game)
+    start_1 = loc_1[0] + loc_1[1] * game.height
+    start_2 = loc_2[0] + loc_2[1] * game.height
+    region_1 = _flood_fill(masks, start_1, free, MAX_REGION_CELLS)
+    if region_1 is None:
+        return None
+    region_2 = _flood_fill(masks, start_2, free, MAX_REGION_CELLS)
+    if region_2 is None or region_1 & region_2:
+        return None
+
+    memo = _LONGEST_PATHS.setdefault((game.width, game.height), {})
+    if len(memo) > _MAX_MEMO_ENTRIES:
+        memo.clear()
+
+    # The active player moves first, so it wins only with a strictly
+    # longer path than its opponent
+    best_length, best_move = 0, None
+    options = masks[start_1] & region_1
+    while options:
+        low = options & -options
+        idx = low.bit_length() - 1
+        length = 1 + _longest_path(masks, memo, idx, region_1 ^ low)
+        if length > best_length:
+            best_length, best_move = length, cells[idx]
+        options ^= low
+    opponent_length = _longest_path(masks, memo, start_2, region_2)
+
+    if best_length > opponent_length:
+        return game.active_player, best_move
+    return game.inactive_player, best_move
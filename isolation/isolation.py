@@ -8,11 +8,202 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 import random
+import time
 import timeit
 from copy import copy
 
 TIME_LIMIT_MILLIS = 150
 
+# Clocks that can time the moves in Board.play(): wall-clock time, the CPU
+# time of the whole process, or the CPU time of the thread playing the game
+CLOCK_WALL = "wall"
+CLOCK_PROCESS = "process"
+CLOCK_THREAD = "thread"
+CLOCKS = {
+    CLOCK_WALL: timeit.default_timer,
+    CLOCK_PROCESS: time.process_time,
+    CLOCK_THREAD: time.thread_time,
+}
+
+# Cache of Zobrist key tables keyed by (width, height)
+_ZOBRIST_KEYS = {}
+
+
+def zobrist_keys(width, height):
+    """Return the Zobrist key tables for a board of the given size.
+
+    The keys are drawn from a generator seeded with the board size, so they
+    are the same in every process and can be used to key on-disk caches.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    Returns
+    -------
+    (list<int>, list<int>, list<int>, int)
+        The 64-bit keys for a blocked cell, player 1 on a cell and player 2
+        on a cell (indexed by cell index), and the key XORed in while player 2
+        holds the initiative.
+    """
+    key = (width, height)
+    keys = _ZOBRIST_KEYS.get(key)
+    if keys is None:
+        rng = random.Random("isolation-zobrist-{}x{}".format(width, height))
+        size = width * height
+        keys = _ZOBRIST_KEYS[key] = (
+            [rng.getrandbits(64) for _ in range(size)],
+            [rng.getrandbits(64) for _ in range(size)],
+            [rng.getrandbits(64) for _ in range(size)],
+            rng.getrandbits(64))
+    return keys
+
+
+# Cache of knight neighbour tables keyed by (width, height)
+_KNIGHT_NEIGHBOURS = {}
+
+
+def knight_neighbours(width, height):
+    """Return the cell indices one knight move away from each cell of a
+    board of the given size.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    Returns
+    -------
+    tuple<tuple<int>>
+        The neighbouring cell indices of every cell index.
+    """
+    key = (width, height)
+    neighbours = _KNIGHT_NEIGHBOURS.get(key)
+    if neighbours is None:
+        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                      (1, -2), (1, 2), (2, -1), (2, 1)]
+        neighbours = []
+        for idx in range(width * height):
+            r, c = idx % height, idx // height
+            neighbours.append(tuple(r + dr + (c + dc) * height
+                                    for dr, dc in directions
+                                    if 0 <= r + dr < height and 0 <= c + dc < width))
+        neighbours = _KNIGHT_NEIGHBOURS[key] = tuple(neighbours)
+    return neighbours
+
+
+# Coordinate maps (row, col, width, height) -> (row, col) of the symmetries
+# of the board; the last four swap rows and columns, so they only apply to
+# square boards
+_SYMMETRY_MAPS = (
+    lambda r, c, w, h: (r, c),
+    lambda r, c, w, h: (r, w - 1 - c),
+    lambda r, c, w, h: (h - 1 - r, c),
+    lambda r, c, w, h: (h - 1 - r, w - 1 - c),
+    lambda r, c, w, h: (c, r),
+    lambda r, c, w, h: (c, h - 1 - r),
+    lambda r, c, w, h: (w - 1 - c, r),
+    lambda r, c, w, h: (w - 1 - c, h - 1 - r),
+)
+
+# Cache of symmetry tables keyed by (width, height)
+_SYMMETRY_TABLES = {}
+
+
+def symmetry_tables(width, height):
+    """Return the lookup tables for the symmetries of a board of the given
+    size. Square boards have the 8 symmetries of the square (rotations and
+    reflections); other boards only have the 4 that keep the width and the
+    height (identity, both reflections and the half turn).
+
+    Transforms are numbered by their position in the returned list, and
+    transform 0 is always the identity.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns on the board.
+
+    height : int
+        The number of rows on the board.
+
+    Returns
+    -------
+    list<(tuple<int>, tuple<int>, list<int>, list<int>, list<int>)>
+        For each transform, the cell index each cell index is mapped to, the
+        inverse of that mapping, and the blocked cell, player 1 and player 2
+        Zobrist keys of each cell index after the transform is applied.
+    """
+    key = (width, height)
+    tables = _SYMMETRY_TABLES.get(key)
+    if tables is None:
+        cell_keys, p1_keys, p2_keys, _ = zobrist_keys(width, height)
+        size = width * height
+        maps = _SYMMETRY_MAPS if width == height else _SYMMETRY_MAPS[:4]
+        tables = []
+        for transform in maps:
+            forward = []
+            for idx in range(size):
+                r, c = transform(idx % height, idx // height, width, height)
+                forward.append(r + c * height)
+            inverse = [0] * size
+            for idx, target in enumerate(forward):
+                inverse[target] = idx
+            tables.append((tuple(forward), tuple(inverse),
+                           [cell_keys[i] for i in forward],
+                           [p1_keys[i] for i in forward],
+                           [p2_keys[i] for i in forward]))
+        _SYMMETRY_TABLES[key] = tables
+    return tables
+
+
+def canonical_key(width, height, blocked, p1_loc, p2_loc, side_key=0):
+    """Return the smallest Zobrist key over the symmetries of a game state
+    and the transform that produces it.
+
+    Parameters
+    ----------
+    width, height : int
+        The board size.
+
+    blocked : iterable<int>
+        The cell indices of the blocked cells.
+
+    p1_loc, p2_loc : int or None
+        The cell index of each player's last move, or None if the player has
+        not moved.
+
+    side_key : int (optional)
+        The Zobrist key for the player holding the initiative, which is the
+        same in every transform.
+
+    Returns
+    -------
+    (int, int)
+        The canonical key and the transform that maps the state onto it.
+    """
+    blocked = list(blocked)
+    best_key, best_transform = None, 0
+    for transform, (_, _, cell_keys, p1_keys, p2_keys) in enumerate(
+            symmetry_tables(width, height)):
+        key = side_key
+        for idx in blocked:
+            key ^= cell_keys[idx]
+        if p1_loc is not None:
+            key ^= p1_keys[p1_loc]
+        if p2_loc is not None:
+            key ^= p2_keys[p2_loc]
+        if best_key is None or key < best_key:
+            best_key, best_transform = key, transform
+    return best_key, best_transform
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -33,11 +224,16 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    seed : int (optional)
+        The seed of the board's own random number generator, which orders
+        the moves returned by get_legal_moves(); copies of the board share
+        the generator. If None, the global `random` module is used.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __init__(self, player_1, player_2, width=7, height=7, seed=None):
         self.width = width
         self.height = height
         self.move_count = 0
@@ -52,8 +248,87 @@ class Board(object):
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
 
+        # (cell index, previous location, previous Zobrist key) of every
+        # move applied by push()
+        self._undo_stack = []
+
+        # Zobrist key of the current state; the player keys are indexed the
+        # same way as the last move entries at the end of the board state
+        self._zobrist = 0
+        cell_keys, p1_keys, p2_keys, self._side_key = zobrist_keys(width, height)
+        self._cell_keys = cell_keys
+        self._player_keys = (None, p1_keys, p2_keys)
+
+        # The number of open cells one knight move away from each cell,
+        # updated as cells are blocked, so a player's mobility is the
+        # degree of its cell
+        self._neighbours = knight_neighbours(width, height)
+        self._degrees = [len(n) for n in self._neighbours]
+
+        self._rng = random if seed is None else random.Random(seed)
+
     def hash(self):
-        return str(self._board_state).__hash__()
+        """Return the Zobrist key of the current state (see `zobrist`). """
+        return self._zobrist
+
+    @property
+    def zobrist(self):
+        """A 64-bit Zobrist key of the current state, covering the blocked
+        cells, both player locations and which player holds the initiative.
+        The key is updated incrementally by `apply_move()`.
+        """
+        return self._zobrist
+
+    def canonical_hash(self):
+        """Return the Zobrist key of the canonical form of the current state
+        and the transform that maps the board onto it.
+
+        Positions that are rotations or reflections of each other have the
+        same canonical key, so caches and opening books keyed on it share
+        entries between them. Moves are stored in the canonical frame with
+        `to_canonical()` and mapped back to the board with `from_canonical()`.
+        Square boards use all 8 symmetries, other boards the 4 that keep
+        their shape (see `symmetry_tables`).
+
+        Returns
+        -------
+        (int, int)
+            The canonical key and the transform number.
+        """
+        state = self._board_state
+        size = self.width * self.height
+        return canonical_key(self.width, self.height,
+                             [idx for idx in range(size) if state[idx]],
+                             state[-1], state[-2],
+                             self._side_key if state[-3] else 0)
+
+    def to_canonical(self, move, transform):
+        """Map a move on the board to the frame of a canonical form.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) on the board.
+
+        transform : int
+            A transform number returned by `canonical_hash()`.
+
+        Returns
+        -------
+        (int, int)
+            The coordinate pair of the move in the canonical frame.
+        """
+        forward = symmetry_tables(self.width, self.height)[transform][0]
+        idx = forward[move[0] + move[1] * self.height]
+        return (idx % self.height, idx // self.height)
+
+    def from_canonical(self, move, transform):
+        """Map a move in the frame of a canonical form back to the board
+        (the inverse of `to_canonical()`).
+        """
+        inverse = symmetry_tables(self.width, self.height)[transform][1]
+        idx = inverse[move[0] + move[1] * self.height]
+        return (idx % self.height, idx // self.height)
 
     @property
     def active_player(self):
@@ -97,6 +372,10 @@ class Board(object):
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._undo_stack = copy(self._undo_stack)
+        new_board._zobrist = self._zobrist
+        new_board._degrees = copy(self._degrees)
+        new_board._rng = self._rng
         return new_board
 
     def forecast_move(self, move):
@@ -201,19 +480,102 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         last_move_idx = int(self.active_player == self._player_2) + 1
+        player_keys = self._player_keys[last_move_idx]
+        last_loc = self._board_state[-last_move_idx]
+        if last_loc != Board.NOT_MOVED:
+            self._zobrist ^= player_keys[last_loc]
+        self._zobrist ^= self._cell_keys[idx] ^ player_keys[idx] ^ self._side_key
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
+        degrees = self._degrees
+        for neighbour in self._neighbours[idx]:
+            degrees[neighbour] -= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
+    def push(self, move):
+        """Apply a move to the board in-place and remember how to revert it
+        with `pop()`. This is the same as `apply_move()`, but lets search
+        code walk the game tree without copying the board at every node.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        last_move_idx = int(self.active_player == self._player_2) + 1
+        self._undo_stack.append((move[0] + move[1] * self.height,
+                                 self._board_state[-last_move_idx],
+                                 self._zobrist))
+        self.apply_move(move)
+
+    def pop(self):
+        """Revert the last move applied with `push()`. """
+        idx, last_loc, self._zobrist = self._undo_stack.pop()
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+        last_move_idx = int(self.active_player == self._player_2) + 1
+        self._board_state[-last_move_idx] = last_loc
+        self._board_state[idx] = Board.BLANK
+        self._board_state[-3] ^= 1
+        degrees = self._degrees
+        for neighbour in self._neighbours[idx]:
+            degrees[neighbour] += 1
+
+    def mobility(self, player=None):
+        """Return the number of legal moves of the specified player, without
+        building the list of moves.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the mobility of the active player on the board.
+
+        Returns
+        -------
+        int
+            The number of legal moves, the same as
+            `len(self.get_legal_moves(player))`.
+        """
+        if player is None:
+            player = self._active_player
+        if player == self._player_1:
+            idx = self._board_state[-1]
+        elif player == self._player_2:
+            idx = self._board_state[-2]
+        else:
+            raise RuntimeError(
+                "Invalid player in mobility: {}".format(player))
+        if idx == Board.NOT_MOVED:
+            return len(self.get_blank_spaces())
+        return self._degrees[idx]
+
+    def degree(self, cell):
+        """Return the number of open cells one knight move away from a cell,
+        which is the mobility a player would have after moving there.
+
+        Parameters
+        ----------
+        cell : (int, int)
+            A coordinate pair (row, column) on the board.
+
+        Returns
+        -------
+        int
+            The number of open knight neighbours of the cell.
+        """
+        return self._degrees[cell[0] + cell[1] * self.height]
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return player == self._inactive_player and not self.mobility(self._active_player)
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return player == self._active_player and not self.mobility(self._active_player)
 
     def utility(self, player):
         """Returns the utility of the current game state from the perspective
@@ -237,7 +599,7 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self.mobility(self._active_player):
 
             if player == self._inactive_player:
                 return float("inf")
@@ -259,7 +621,7 @@ class Board(object):
                       (1, -2), (1, 2), (2, -1), (2, 1)]
         valid_moves = [(r + dr, c + dc) for dr, dc in directions
                        if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+        self._rng.shuffle(valid_moves)
         return valid_moves
 
     def print_board(self):
@@ -295,7 +657,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, clock=CLOCK_WALL, move_times=None):
         """Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
 
@@ -305,6 +667,21 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        clock : str (optional)
+            The clock used to time each turn and by the `time_left` function
+            passed to the players: "wall" for wall-clock time, "process" for
+            the CPU time of this process, or "thread" for the CPU time of
+            the calling thread. CPU time does not advance while other
+            processes hold the core, so timeouts and search depths under
+            load match an idle machine. Work done outside the calling thread
+            only counts with "process", and work in other processes (e.g.
+            pondering or lazy SMP helpers) is not counted by either CPU
+            clock.
+
+        move_times : list (optional)
+            If given, the number of milliseconds taken by each turn
+            (including a final turn that ends the game) is appended to it.
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -312,9 +689,12 @@ class Board(object):
             move history, and a string indicating the reason for losing
             (e.g., timeout or invalid move).
         """
+        if clock not in CLOCKS:
+            raise ValueError("Unknown clock: {}".format(clock))
         move_history = []
 
-        time_millis = lambda: 1000 * timeit.default_timer()
+        timer = CLOCKS[clock]
+        time_millis = lambda: 1000 * timer()
 
         while True:
 
@@ -325,6 +705,8 @@ class Board(object):
             time_left = lambda : time_limit - (time_millis() - move_start)
             curr_move = self._active_player.get_move(game_copy, time_left)
             move_end = time_left()
+            if move_times is not None:
+                move_times.append(time_limit - move_end)
 
             if curr_move is None:
                 curr_move = Board.NOT_MOVED
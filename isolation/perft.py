@@ -0,0 +1,246 @@
+"""
+This file contains a perft ("performance test") node counter for Isolation.
+Perft walks the full game tree from a position to a fixed depth and counts
+the positions reached after exactly that many plies; games that end earlier
+contribute nothing. The counts depend only on the rules, so they check move
+generation, `push()` and `pop()` of a board implementation for correctness,
+and the time taken measures their speed.
+
+Every alternative board backend should produce the same counts as the
+reference `isolation.Board`; `verify()` compares the divided counts of two
+backends on a set of positions. Run the tool with, for example:
+
+    python -m isolation.perft --depth 5 --backend bitboard --divide
+    python -m isolation.perft --depth 4 --verify bitboard
+"""
+import argparse
+import random
+import timeit
+
+from .isolation import Board
+from .bitboard import BitBoard
+
+BACKENDS = {"board": Board, "bitboard": BitBoard}
+
+# Positions searched by `verify`: random play to each of these plies
+VERIFY_PLIES = (0, 1, 2, 6, 12, 20)
+VERIFY_SEED = 0
+
+# The hash table of `perft` is cleared when it grows past this many
+# entries, and is only used for subtrees at least this deep
+MAX_HASH_ENTRIES = 2**20
+HASH_MIN_DEPTH = 3
+
+
+def perft(game, depth, table=None):
+    """Count the positions reached from the game after exactly `depth`
+    plies.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The root position; it is walked with `push()`/`pop()` and left
+        unchanged.
+
+    depth : int
+        The number of plies to search; the root is the only position at
+        depth 0 (or less).
+
+    table : dict (optional)
+        A table of counts keyed by (canonical hash, depth). Rotations and
+        reflections of a position have the same count, and so do
+        transpositions, so each of them is only counted once. (Real
+        transpositions are rare in Isolation: a player has to visit the
+        same cells in a different order, which takes at least four moves.)
+        Subtrees shallower than `HASH_MIN_DEPTH` are too cheap to be worth
+        the canonical hash. The table may be shared between calls on boards
+        of the same size.
+
+    Returns
+    -------
+    int
+        The number of leaf positions.
+    """
+    if depth <= 0:
+        return 1
+    moves = game.get_legal_moves()
+    if depth == 1:
+        return len(moves)
+    key = None
+    if table is not None and depth >= HASH_MIN_DEPTH:
+        key = (game.canonical_hash()[0], depth)
+        count = table.get(key)
+        if count is not None:
+            return count
+    count = 0
+    for move in moves:
+        game.push(move)
+        count += perft(game, depth - 1, table)
+        game.pop()
+    if key is not None:
+        if len(table) >= MAX_HASH_ENTRIES:
+            table.clear()
+        table[key] = count
+    return count
+
+
+def divide(game, depth, table=None):
+    """Return the perft count under each legal move of the active player.
+
+    Returns
+    -------
+    dict
+        The number of positions `depth` plies from the root reached through
+        each root move, keyed by move.
+
+    Raises
+    ------
+    ValueError
+        If `depth` is less than 1, since there are no root moves to divide
+        the count between.
+    """
+    if depth < 1:
+        raise ValueError("divide needs a depth of at least 1")
+    counts = {}
+    for move in sorted(game.get_legal_moves()):
+        game.push(move)
+        counts[move] = perft(game, depth - 1, table)
+        game.pop()
+    return counts
+
+
+def timed_perft(game, depth, use_hash=False):
+    """Run perft and return the count, the elapsed seconds and the leaf
+    nodes per second.
+    """
+    table = {} if use_hash else None
+    start = timeit.default_timer()
+    count = perft(game, depth, table)
+    elapsed = timeit.default_timer() - start
+    return count, elapsed, count / elapsed if elapsed > 0 else 0.
+
+
+def verify_positions(width=7, height=7, plies=VERIFY_PLIES, seed=VERIFY_SEED):
+    """Return the move sequences of the verification positions, reached by
+    seeded random play (shorter if a game ends early).
+    """
+    rng = random.Random(seed)
+    positions = []
+    for ply in plies:
+        game = Board("Player1", "Player2", width, height)
+        moves = []
+        while len(moves) < ply:
+            legal_moves = sorted(game.get_legal_moves())
+            if not legal_moves:
+                break
+            moves.append(rng.choice(legal_moves))
+            game.apply_move(moves[-1])
+        positions.append(moves)
+    return positions
+
+
+def verify(backend, depth, reference=Board, positions=None, width=7, height=7):
+    """Compare the divided perft counts of a board backend with those of
+    the reference implementation.
+
+    Parameters
+    ----------
+    backend : class
+        The board class to check, with the constructor of `isolation.Board`.
+
+    depth : int
+        The perft depth of every comparison.
+
+    reference : class (optional)
+        The board class trusted to be correct.
+
+    positions : list<list<(int, int)>> (optional)
+        The moves leading to each position from the empty board; the
+        positions of `verify_positions` if None.
+
+    width, height : int (optional)
+        The board size.
+
+    Returns
+    -------
+    list<(list<(int, int)>, (int, int), int, int)>
+        The moves of the position, the root move, and the reference and
+        backend counts of every mismatch (with None for a root move that
+        only one implementation generates).
+    """
+    if positions is None:
+        positions = verify_positions(width, height)
+    mismatches = []
+    for moves in positions:
+        counts = []
+        for board_class in (reference, backend):
+            game = board_class("Player1", "Player2", width, height)
+            for move in moves:
+                game.apply_move(move)
+            counts.append(divide(game, depth))
+        expected, actual = counts
+        for move in sorted(set(expected) | set(actual)):
+            if expected.get(move) != actual.get(move):
+                mismatches.append((moves, move, expected.get(move), actual.get(move)))
+    return mismatches
+
+
+def _parse_moves(text):
+    """Parse moves written as "row,col row,col ...". """
+    return [tuple(int(x) for x in move.split(",")) for move in text.split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the Isolation game tree "
+                                                 "to a fixed depth.")
+    parser.add_argument("--depth", type=int, default=4, help="number of plies")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="board",
+                        help="board implementation to count with")
+    parser.add_argument("--moves", default="",
+                        help='moves to the root position, e.g. "3,3 2,1"')
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--divide", action="store_true",
+                        help="print the count under each root move")
+    parser.add_argument("--hash", action="store_true",
+                        help="reuse the counts of symmetric and transposed "
+                             "positions")
+    parser.add_argument("--verify", choices=sorted(BACKENDS), default=None,
+                        help="compare a backend with the reference Board")
+    args = parser.parse_args()
+    if args.depth < 1 and (args.divide or args.verify is not None):
+        parser.error("--divide and --verify need a --depth of at least 1")
+
+    if args.verify is not None:
+        backend = BACKENDS[args.verify]
+        positions = verify_positions(args.width, args.height)
+        mismatches = verify(backend, args.depth, positions=positions,
+                            width=args.width, height=args.height)
+        for moves, move, expected, actual in mismatches:
+            print("MISMATCH after {}: {} expected {} got {}".format(
+                moves, move, expected, actual))
+        print("{}: {} positions at depth {}, {} mismatches".format(
+            backend.__name__, len(positions), args.depth, len(mismatches)))
+        raise SystemExit(1 if mismatches else 0)
+
+    game = BACKENDS[args.backend]("Player1", "Player2", args.width, args.height)
+    for move in _parse_moves(args.moves):
+        game.apply_move(move)
+
+    table = {} if args.hash else None
+    if args.divide:
+        start = timeit.default_timer()
+        counts = divide(game, args.depth, table)
+        elapsed = timeit.default_timer() - start
+        for move, count in counts.items():
+            print("{}: {}".format(move, count))
+        count = sum(counts.values())
+    else:
+        count, elapsed, _ = timed_perft(game, args.depth, args.hash)
+    print("\nNodes: {}".format(count))
+    print("Time: {:.3f} s".format(elapsed))
+    print("Nodes per second: {:.0f}".format(count / elapsed if elapsed > 0 else 0.))
+
+
+if __name__ == "__main__":
+    main()
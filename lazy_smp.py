@@ -0,0 +1,348 @@
+"""Parallel iterative deepening for the alpha-beta agent ("lazy SMP").
+
+Helper processes search the same root position as the agent, each starting
+from a different depth and with a differently seeded move order, and all of
+them read and write one lock-free transposition table kept in
+`multiprocessing.shared_memory`. The agent returns the deepest result that
+any of them completed before its own search times out.
+
+Run this file directly to report the depth reached and the nodes searched
+per second for several worker counts on a fixed set of positions.
+"""
+import multiprocessing
+import queue
+import random
+import struct
+import timeit
+import weakref
+
+from multiprocessing import shared_memory
+
+from game_agent import (AlphaBetaPlayer, SearchTimeout, TranspositionTable,
+                        REPLACE_ALWAYS, REPLACE_DEPTH, SEARCH_ALPHABETA,
+                        custom_score)
+
+# Stand-in for the opponent on the boards rebuilt in the helper processes
+OPPONENT = "opponent"
+
+# Each slot holds three 64-bit words: key ^ score ^ meta, score, meta
+_SLOT = struct.Struct("<QQQ")
+_DOUBLE = struct.Struct("<d")
+_UINT64 = struct.Struct("<Q")
+
+# Set in the meta word of every stored entry so that an empty (all zero)
+# slot never matches a key
+_VALID = 1 << 63
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """Transposition table stored in a shared memory block, with the same
+    interface and replacement policies as `game_agent.TranspositionTable`.
+
+    Entries are written without locks. Each slot stores the key XORed with
+    the two data words, so a slot torn by concurrent writers fails the key
+    check on the next probe and is treated as a miss.
+
+    Parameters
+    ----------
+    max_entries : int (optional)
+        The number of slots in the table (24 bytes each).
+
+    replacement : str (optional)
+        The replacement policy (see `game_agent.TranspositionTable`).
+
+    name : str (optional)
+        The name of an existing shared memory block to attach to. A new
+        block is created if no name is given.
+    """
+    def __init__(self, max_entries=2**16, replacement=REPLACE_DEPTH, name=None):
+        if replacement not in (REPLACE_ALWAYS, REPLACE_DEPTH):
+            raise ValueError("Unknown replacement policy: {}".format(replacement))
+        self.max_entries = max_entries
+        self.replacement = replacement
+        self.generation = 0
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=_SLOT.size * max_entries)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._buf = self.shm.buf
+
+    @property
+    def name(self):
+        """The name of the shared memory block holding the table. """
+        return self.shm.name
+
+    def clear(self):
+        """Remove all entries from the table. """
+        self._buf[:] = bytes(len(self._buf))
+
+    def probe(self, key):
+        """Return the entry stored for the key, or None if there is none. """
+        check, score_bits, meta = _SLOT.unpack_from(
+            self._buf, (key % self.max_entries) * _SLOT.size)
+        if not meta or check ^ score_bits ^ meta != key:
+            return None
+        move_code = (meta >> 18) & 0xffff
+        best_move = divmod(move_code - 1, 256) if move_code else None
+        return (key, meta & 0xffff, (meta >> 16) & 0x3,
+                _DOUBLE.unpack(_UINT64.pack(score_bits))[0], best_move,
+                (meta >> 34) & 0xffff)
+
+    def store(self, key, depth, bound, score, best_move):
+        """Store a search result, subject to the replacement policy (see
+        `game_agent.TranspositionTable.store`).
+        """
+        offset = (key % self.max_entries) * _SLOT.size
+        if self.replacement == REPLACE_DEPTH:
+            check, score_bits, meta = _SLOT.unpack_from(self._buf, offset)
+            if (meta and check ^ score_bits ^ meta != key and
+                    (meta >> 34) & 0xffff == self.generation & 0xffff and
+                    meta & 0xffff > depth):
+                return
+        move_code = 0 if best_move is None else best_move[0] * 256 + best_move[1] + 1
+        meta = (_VALID | min(depth, 0xffff) | bound << 16 | move_code << 18 |
+                (self.generation & 0xffff) << 34)
+        score_bits = _UINT64.unpack(_DOUBLE.pack(score))[0]
+        _SLOT.pack_into(self._buf, offset, key ^ score_bits ^ meta, score_bits, meta)
+
+    def close(self, unlink=False):
+        """Detach from the shared memory block, and free it if `unlink`. """
+        self._buf.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def describe_board(game, agent):
+    """Return a picklable description of the game state that does not refer
+    to the player objects (see `restore_board`).
+    """
+    blank = set(game.get_blank_spaces())
+    blocked = [(r, c) for c in range(game.width) for r in range(game.height)
+               if (r, c) not in blank]
+    if game.move_count % 2 == 0:
+        player_1, player_2 = game.active_player, game.inactive_player
+    else:
+        player_1, player_2 = game.inactive_player, game.active_player
+    return (type(game), game.width, game.height, blocked,
+            game.get_player_location(player_1),
+            game.get_player_location(player_2), agent == player_1)
+
+
+def restore_board(description, agent):
+    """Rebuild a board from `describe_board` with `agent` in its seat and
+    `OPPONENT` in the other one.
+
+    The blocked cells are replayed with `apply_move()`, ending with each
+    player's current location, which reproduces the blocked cells, player
+    locations, initiative and Zobrist key of the original board.
+    """
+    board_class, width, height, blocked, p1_loc, p2_loc, agent_is_p1 = description
+    players = (agent, OPPONENT) if agent_is_p1 else (OPPONENT, agent)
+    board = board_class(players[0], players[1], width=width, height=height)
+    others = [cell for cell in blocked if cell != p1_loc and cell != p2_loc]
+    num_p1_moves = (len(blocked) + 1) // 2
+    p1_moves = others[:num_p1_moves - 1] + [p1_loc]
+    p2_moves = others[num_p1_moves - 1:] + ([p2_loc] if p2_loc is not None else [])
+    for idx in range(len(blocked)):
+        board.apply_move(p1_moves[idx // 2] if idx % 2 == 0 else p2_moves[idx // 2])
+    return board
+
+
+def _search_worker(worker_id, tasks, results, table_name, tt_entries,
+                   tt_replacement, score_fn, timeout, search_mode):
+    """Helper process: run iterative deepening on every root position read
+    from `tasks` until its deadline, reporting each completed depth as
+    (search_id, worker_id, depth, move, nodes) on `results`. A final
+    report with depth 0 gives the total node count of the search.
+    """
+    random.seed(worker_id)
+    table = SharedTranspositionTable(tt_entries, tt_replacement, name=table_name)
+    player = AlphaBetaPlayer(score_fn=score_fn, timeout=timeout, tt_entries=0,
+                             search_mode=search_mode)
+    player.transposition_table = table
+    try:
+        for search_id, description, deadline, generation in iter(tasks.get, None):
+            table.generation = generation
+            game = restore_board(description, player)
+            nodes = [0]
+
+            def time_left():
+                nodes[0] += 1
+                return 1000 * (deadline - timeit.default_timer())
+
+            player.time_left = time_left
+            player._killers = {}
+            try:
+                # Odd helpers start one ply deeper to spread the work
+                max_depth = len(game.get_blank_spaces())
+                for depth in range(1 + worker_id % 2, max_depth + 1):
+                    move = player.alphabeta(game, depth)
+                    results.put((search_id, worker_id, depth, move, nodes[0]))
+            except SearchTimeout:
+                pass
+            results.put((search_id, worker_id, 0, None, nodes[0]))
+    finally:
+        table.close()
+
+
+def _shutdown(table, processes, tasks):
+    """Stop the helper processes and free the shared transposition table. """
+    for task_queue in tasks:
+        task_queue.put(None)
+    for process in processes:
+        process.join(timeout=1)
+        if process.is_alive():
+            process.terminate()
+    table.close(unlink=True)
+
+
+class LazySMPPlayer(AlphaBetaPlayer):
+    """Alpha-beta agent that searches with `workers - 1` helper processes in
+    addition to its own iterative deepening, all sharing one transposition
+    table in shared memory.
+
+    The helper processes are started on the first call to get_move() and
+    are stopped by close() or when the player is garbage collected.
+
+    Parameters
+    ----------
+    workers : int (optional)
+        The total number of searchers, including this process.
+
+    search_depth, score_fn, timeout, tt_entries, tt_replacement,
+    move_ordering, search_mode, aspiration_window
+        See `game_agent.AlphaBetaPlayer`. Pondering is not supported.
+    """
+    def __init__(self, workers=multiprocessing.cpu_count(), search_depth=3,
+                 score_fn=custom_score, timeout=10., tt_entries=2**18,
+                 tt_replacement=REPLACE_DEPTH, move_ordering=True,
+                 search_mode=SEARCH_ALPHABETA, aspiration_window=None):
+        super().__init__(search_depth, score_fn, timeout, tt_entries=0,
+                         move_ordering=move_ordering, search_mode=search_mode,
+                         aspiration_window=aspiration_window)
+        self.workers = workers
+        self.transposition_table = SharedTranspositionTable(tt_entries, tt_replacement)
+        self._tt_replacement = tt_replacement
+        self._processes = []
+        self._tasks = []
+        self._results = None
+        self._search_id = 0
+        self._finalizer = weakref.finalize(
+            self, _shutdown, self.transposition_table, self._processes, self._tasks)
+
+        # Depth, move and node reports of the helpers for the last move
+        self.worker_reports = []
+
+    def close(self):
+        """Stop the helper processes and free the shared transposition table. """
+        self._finalizer()
+
+    def get_move(self, game, time_left):
+        """Search for the best move with all workers and return the deepest
+        completed result before the time limit expires (see
+        `game_agent.AlphaBetaPlayer.get_move`). A move from the opening book
+        or the endgame solver is returned without looking at the helpers.
+        """
+        if self.workers < 2 or not game.get_legal_moves():
+            return super().get_move(game, time_left)
+
+        self._start_workers()
+        self._search_id += 1
+        deadline = timeit.default_timer() + (time_left() - self.TIMER_THRESHOLD) / 1000.
+        # The table moves to the next generation when our own search starts
+        task = (self._search_id, describe_board(game, self), deadline,
+                self.transposition_table.generation + 1)
+        for task_queue in self._tasks:
+            task_queue.put(task)
+
+        best_move = super().get_move(game, time_left)
+        best_depth = self._completed_depth
+        self.worker_reports = []
+        if best_depth is None:
+            return best_move
+
+        legal_moves = game.get_legal_moves()
+        while True:
+            try:
+                report = self._results.get_nowait()
+            except queue.Empty:
+                break
+            search_id, _, depth, move, _ = report
+            if search_id != self._search_id:
+                continue
+            self.worker_reports.append(report)
+            if depth > best_depth and move in legal_moves:
+                best_depth, best_move = depth, move
+        return best_move
+
+    def _start_workers(self):
+        """Start the helper processes if they are not running yet. """
+        if self._processes:
+            return
+        self._results = multiprocessing.Queue()
+        for worker_id in range(1, self.workers):
+            tasks = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_search_worker, daemon=True,
+                args=(worker_id, tasks, self._results,
+                      self.transposition_table.name,
+                      self.transposition_table.max_entries,
+                      self._tt_replacement, self.score, self.TIMER_THRESHOLD,
+                      self.search_mode))
+            process.start()
+            self._tasks.append(tasks)
+            self._processes.append(process)
+
+
+def main():
+    from isolation import BitBoard
+    from sample_players import improved_score
+
+    time_limit = 1000
+    positions = []
+    rng = random.Random(0)
+    for _ in range(4):
+        game = BitBoard("Player1", "Player2")
+        for _ in range(6):
+            game.apply_move(rng.choice(sorted(game.get_legal_moves())))
+        positions.append(game)
+
+    print("{:^9}{:^13}{:^15}".format("Workers", "Avg. depth", "Nodes/sec"))
+    for workers in sorted({1, 2, 4, multiprocessing.cpu_count()}):
+        player = LazySMPPlayer(workers=workers, score_fn=improved_score)
+        total_depth = 0
+        total_nodes = 0
+        for position in positions:
+            description = describe_board(position, "Player1")
+            game = restore_board(description, player)
+            player.transposition_table.clear()
+
+            nodes = [0]
+            start = timeit.default_timer()
+
+            def time_left():
+                nodes[0] += 1
+                return time_limit - 1000 * (timeit.default_timer() - start)
+
+            player.get_move(game, time_left)
+            depth = player._completed_depth or 0
+            for _, _, worker_depth, _, worker_nodes in player.worker_reports:
+                depth = max(depth, worker_depth)
+            # Wait for the final node count of every helper
+            finished = sum(1 for r in player.worker_reports if r[2] == 0)
+            while finished < workers - 1:
+                report = player._results.get()
+                if report[0] == player._search_id and report[2] == 0:
+                    player.worker_reports.append(report)
+                    finished += 1
+            total_depth += depth
+            total_nodes += nodes[0] + sum(r[4] for r in player.worker_reports if r[2] == 0)
+        player.close()
+        elapsed = time_limit / 1000. * len(positions)
+        print("{:^9}{:^13.1f}{:^15.0f}".format(
+            workers, total_depth / len(positions), total_nodes / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Build and read an opening book of deep-searched first moves for Isolation.
+
+The book is generated offline by running fixed-depth iterative deepening on
+every position in the first few plies where one side has followed the book,
+and is written to a compact binary file of records sorted by board hash.
+Positions are keyed by their canonical hash (see
+`isolation.Board.canonical_hash`) and moves are stored in the canonical
+frame, so one record covers every rotation and reflection of a position.
+Agents open the file lazily with `mmap` and binary search it, so loading
+the book costs nothing until the first lookup.
+
+Generate a book for the 7x7 board with:
+
+    python opening_book.py --plies 4 --depth 7
+"""
+import argparse
+import mmap
+import os
+import struct
+
+# File layout: magic, board width, board height, number of records, then
+# the records sorted by canonical key
+MAGIC = b"ISOBOOK2"
+_HEADER = struct.Struct("<8sBBI")
+_RECORD = struct.Struct("<QBB")
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "opening_book.bin")
+
+
+class OpeningBook:
+    """Read-only view of an opening book file.
+
+    Parameters
+    ----------
+    path : str (optional)
+        The location of the book file. A missing file is treated as an
+        empty book.
+    """
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        self.path = path
+        self._data = None
+        self._count = None
+        self._size = None
+
+    def __len__(self):
+        self._load()
+        return self._count
+
+    def lookup(self, game):
+        """Return the book move for the active player, or None if the game
+        state is not in the book.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        Returns
+        -------
+        (int, int) or None
+            The book move for the current position.
+        """
+        self._load()
+        if not self._count or self._size != (game.width, game.height):
+            return None
+        key, transform = game.canonical_hash()
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record_key, row, col = _RECORD.unpack_from(
+                self._data, _HEADER.size + mid * _RECORD.size)
+            if record_key < key:
+                lo = mid + 1
+            elif record_key > key:
+                hi = mid
+            else:
+                return game.from_canonical((row, col), transform)
+        return None
+
+    def _load(self):
+        """Map the book file into memory on first use. """
+        if self._count is not None:
+            return
+        self._count = 0
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < _HEADER.size:
+            return
+        with open(self.path, "rb") as book_file:
+            self._data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, width, height, count = _HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not an opening book file".format(self.path))
+        self._size = (width, height)
+        self._count = count
+
+
+def write_book(path, entries, width=7, height=7):
+    """Write a dict of canonical board hash -> canonical move to a book
+    file.
+    """
+    with open(path, "wb") as book_file:
+        book_file.write(_HEADER.pack(MAGIC, width, height, len(entries)))
+        for key in sorted(entries):
+            book_file.write(_RECORD.pack(key, *entries[key]))
+
+
+def build_book(plies=4, depth=7, score_fn=None, width=7, height=7, progress=None):
+    """Search the opening positions of the game and return the book moves.
+
+    For each seat, the positions in the first `plies` plies are expanded by
+    following the book move when that seat is to move and every legal move
+    when the opponent is to move, and each position where the seat is to
+    move is searched to a fixed depth.
+
+    Parameters
+    ----------
+    plies : int (optional)
+        The number of plies covered by the book.
+
+    depth : int (optional)
+        The search depth used to choose each book move.
+
+    score_fn : callable (optional)
+        The evaluation function of the searching agent.
+
+    width, height : int (optional)
+        The board size.
+
+    progress : callable (optional)
+        Called with (number of positions searched, canonical hash, move)
+        after each search.
+
+    Returns
+    -------
+    dict
+        The book move in the canonical frame for each canonical hash.
+    """
+    from isolation import BitBoard
+    from game_agent import AlphaBetaPlayer, custom_score_2
+
+    searchers = [AlphaBetaPlayer(score_fn=score_fn or custom_score_2, timeout=0)
+                 for _ in range(2)]
+    for searcher in searchers:
+        searcher.time_left = lambda: float("inf")
+
+    def search(game):
+        player = game.active_player
+        move = None
+        for d in range(1, min(depth, len(game.get_blank_spaces())) + 1):
+            move = player.alphabeta(game, d)
+        return move
+
+    entries = {}
+    root = BitBoard(searchers[0], searchers[1], width=width, height=height)
+    for book_seat in (0, 1):
+        level = [root]
+        for ply in range(plies):
+            # Symmetric positions share a book entry, so only one of them
+            # is expanded
+            next_level, seen = [], set()
+            for game in level:
+                if game.move_count % 2 != book_seat:
+                    for m in game.get_legal_moves():
+                        child = game.forecast_move(m)
+                        child_key = child.canonical_hash()[0]
+                        if child_key not in seen:
+                            seen.add(child_key)
+                            next_level.append(child)
+                    continue
+                key, transform = game.canonical_hash()
+                if key not in entries:
+                    move = search(game)
+                    if move is None or move == (-1, -1):
+                        continue
+                    entries[key] = game.to_canonical(move, transform)
+                    if progress is not None:
+                        progress(len(entries), key, entries[key])
+                next_level.append(game.forecast_move(
+                    game.from_canonical(entries[key], transform)))
+            level = next_level
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate an Isolation opening book.")
+    parser.add_argument("--plies", type=int, default=4,
+                        help="number of plies covered by the book")
+    parser.add_argument("--depth", type=int, default=7,
+                        help="search depth for each book move")
+    parser.add_argument("--output", default=DEFAULT_BOOK_PATH,
+                        help="location of the book file")
+    args = parser.parse_args()
+
+    def progress(count, key, move):
+        print("{:>6}  {:016x}  {}".format(count, key, move), flush=True)
+
+    entries = build_book(plies=args.plies, depth=args.depth, progress=progress)
+    write_book(args.output, entries)
+    print("Wrote {} positions to {}".format(len(entries), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Persistent Bradley-Terry ratings of Isolation agents.
+
+The store keeps the number of games each agent has won against each other
+agent in a small JSON file, so results accumulate across tournament runs.
+Ratings are fitted to all recorded results with the minorization-
+maximization algorithm for the Bradley-Terry model and reported on the Elo
+scale, with a standard error from the Fisher information of the fit. Every
+agent also plays one virtual game, split evenly, against a fixed reference
+rated 0, which keeps the ratings of unbeaten (or winless) agents finite and
+pins the scale.
+
+Because ratings are fitted jointly, a new agent does not need to play every
+other agent: a few games against well-rated anchors (see
+`RatingStore.anchors`) place it on the same scale as the rest of the pool.
+"""
+import json
+import math
+import os
+
+DEFAULT_RATINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "ratings.json")
+
+# Agents whose rating error is below this many Elo points may be anchors
+ANCHOR_MAX_ERROR = 100.
+
+# Number of anchors chosen for each new agent
+ANCHOR_COUNT = 3
+
+# Agents with at least this many games are not played again even if their
+# rating error is large; the error of an agent that wins (or loses) nearly
+# every game barely shrinks with more games, since the games only bound its
+# rating from one side
+SETTLED_GAMES = 40
+
+# Weight of the virtual game against the reference player
+_PRIOR_GAMES = 1.
+
+_ELO_PER_NATURAL_UNIT = 400. / math.log(10.)
+
+
+class RatingStore:
+    """Pairwise game results of a pool of agents, and their ratings.
+
+    Parameters
+    ----------
+    path : str (optional)
+        The location of the rating file; it is read if it exists, and
+        written by `save()`.
+    """
+    def __init__(self, path=DEFAULT_RATINGS_PATH):
+        self.path = path
+        # wins[a][b] is the number of games agent a won against agent b
+        self.wins = {}
+        self._ratings = None
+        if os.path.exists(path):
+            with open(path) as ratings_file:
+                self.wins = json.load(ratings_file)["wins"]
+
+    @property
+    def names(self):
+        """The names of all agents in the store, in sorted order. """
+        names = set(self.wins)
+        for row in self.wins.values():
+            names.update(row)
+        return sorted(names)
+
+    def record(self, winner, loser, count=1):
+        """Add game results to the store.
+
+        Parameters
+        ----------
+        winner, loser : str
+            The names of the agents.
+
+        count : int (optional)
+            The number of games the winner won against the loser.
+        """
+        row = self.wins.setdefault(winner, {})
+        row[loser] = row.get(loser, 0) + count
+        self.wins.setdefault(loser, {}).setdefault(winner, 0)
+        self._ratings = None
+
+    def games(self, name):
+        """Return the number of recorded games played by the agent. """
+        return (sum(self.wins.get(name, {}).values()) +
+                sum(row.get(name, 0) for other, row in self.wins.items()
+                    if other != name))
+
+    def ratings(self):
+        """Return the Elo rating and its standard error for every agent.
+
+        Returns
+        -------
+        dict
+            (rating, standard error) keyed by agent name.
+        """
+        if self._ratings is None:
+            self._ratings = self._fit()
+        return self._ratings
+
+    def is_rated(self, name):
+        """Test whether the agent's rating error is below `ANCHOR_MAX_ERROR`.
+        """
+        rating = self.ratings().get(name)
+        return rating is not None and rating[1] < ANCHOR_MAX_ERROR
+
+    def is_settled(self, name):
+        """Test whether the agent needs no more games: it is rated (see
+        `is_rated`) or has played at least `SETTLED_GAMES` games.
+        """
+        return self.is_rated(name) or self.games(name) >= SETTLED_GAMES
+
+    def anchors(self, name, count=ANCHOR_COUNT, pool=None):
+        """Choose the opponents for the next games of an agent.
+
+        The anchors are the well-rated agents (see `is_rated`) other than
+        the agent itself. An agent that already has games plays the anchors
+        nearest to its rating; an agent with no games plays anchors spread
+        evenly over the range of ratings.
+
+        Parameters
+        ----------
+        name : str
+            The agent to be rated.
+
+        count : int (optional)
+            The largest number of anchors.
+
+        pool : iterable<str> (optional)
+            If given, only these agents may be anchors.
+
+        Returns
+        -------
+        list<str>
+            Up to `count` anchor names.
+        """
+        ratings = self.ratings()
+        pool = set(ratings if pool is None else pool)
+        candidates = sorted((ratings[other][0], other) for other in pool
+                            if other != name and self.is_rated(other))
+        if len(candidates) <= count:
+            return [other for _, other in candidates]
+        if self.games(name):
+            own = ratings[name][0]
+            candidates.sort(key=lambda item: abs(item[0] - own))
+            return [other for _, other in candidates[:count]]
+        step = (len(candidates) - 1) / max(count - 1, 1)
+        return [candidates[round(i * step)][1] for i in range(count)]
+
+    def save(self):
+        """Write the results to the rating file, replacing it atomically. """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as ratings_file:
+            json.dump({"wins": self.wins}, ratings_file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def _fit(self, iterations=1000, tolerance=1e-9):
+        """Fit the Bradley-Terry strengths of all agents to the results. """
+        names = self.names
+        games = {a: {b: self.wins.get(a, {}).get(b, 0) + self.wins.get(b, {}).get(a, 0)
+                     for b in names if b != a}
+                 for a in names}
+        won = {a: sum(self.wins.get(a, {}).values()) + _PRIOR_GAMES / 2
+               for a in names}
+
+        strength = {a: 1. for a in names}
+        for _ in range(iterations):
+            change = 0.
+            for a in names:
+                # The reference player has strength 1
+                total = _PRIOR_GAMES / (strength[a] + 1.)
+                for b, n in games[a].items():
+                    if n:
+                        total += n / (strength[a] + strength[b])
+                new = won[a] / total
+                change = max(change, abs(math.log(new / strength[a])))
+                strength[a] = new
+            if change < tolerance:
+                break
+
+        ratings = {}
+        for a in names:
+            p = strength[a] / (strength[a] + 1.)
+            information = _PRIOR_GAMES * p * (1. - p)
+            for b, n in games[a].items():
+                p = strength[a] / (strength[a] + strength[b])
+                information += n * p * (1. - p)
+            ratings[a] = (_ELO_PER_NATURAL_UNIT * math.log(strength[a]),
+                          _ELO_PER_NATURAL_UNIT / math.sqrt(information))
+        return ratings
@@ -6,7 +6,7 @@ own agent and example heuristic functions.
     ************************************************************************
 """
 
-from random import randint
+import random
 
 
 def null_score(game, player):
@@ -134,7 +134,17 @@ def center_score(game, player):
 
 
 class RandomPlayer():
-    """Player that chooses a move randomly."""
+    """Player that chooses a move randomly.
+
+    Parameters
+    ----------
+    seed : int (optional)
+        The seed of the player's own random number generator. If None, the
+        global `random` module is used.
+    """
+
+    def __init__(self, seed=None):
+        self.rng = random if seed is None else random.Random(seed)
 
     def get_move(self, game, time_left):
         """Randomly select a move from the available legal moves.
@@ -159,7 +169,7 @@ class RandomPlayer():
         legal_moves = game.get_legal_moves()
         if not legal_moves:
             return (-1, -1)
-        return legal_moves[randint(0, len(legal_moves) - 1)]
+        return legal_moves[self.rng.randint(0, len(legal_moves) - 1)]
 
 
 class GreedyPlayer():
@@ -0,0 +1,132 @@
+"""Sequential testing and Elo confidence intervals for tournament results.
+
+Tournament games are played in seat-swapped pairs from the same opening
+(see `tournament.play_round`), so the statistics here treat each pair as one
+sample with a score of 0, 1/2 or 1 for the test agent. The two games of a
+pair are correlated by their shared opening, and scoring pairs rather than
+games keeps that correlation out of the variance estimate.
+
+`SPRT` runs a generalized sequential probability ratio test of the
+hypothesis that the test agent is `elo1` stronger than its opponent against
+the hypothesis that it is only `elo0` stronger, using the normal
+approximation of the log-likelihood ratio, and stops as soon as either
+hypothesis is accepted with the requested error rates.
+"""
+import math
+
+# Default hypotheses (Elo difference of the test agent over its opponent)
+# and error rates of the test
+ELO0 = 0.
+ELO1 = 100.
+ALPHA = 0.05
+BETA = 0.05
+
+H0 = "H0"
+H1 = "H1"
+
+# Two-sided normal quantiles of the confidence levels used in reports
+_Z = {0.9: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+# Scores are clamped away from 0 and 1 before conversion to Elo
+_EPSILON = 1e-3
+
+
+def elo_to_score(elo):
+    """Return the expected score of a player `elo` points stronger than its
+    opponent.
+    """
+    return 1. / (1. + 10 ** (-elo / 400.))
+
+
+def score_to_elo(score):
+    """Return the Elo difference that gives the expected score. """
+    score = min(max(score, _EPSILON), 1. - _EPSILON)
+    return -400. * math.log10(1. / score - 1.)
+
+
+class SPRT:
+    """Sequential probability ratio test on seat-swapped game pairs.
+
+    Parameters
+    ----------
+    elo0, elo1 : float (optional)
+        The Elo difference of the test agent under the null and the
+        alternative hypothesis.
+
+    alpha, beta : float (optional)
+        The probability of accepting H1 when H0 is true, and of accepting
+        H0 when H1 is true.
+    """
+    def __init__(self, elo0=ELO0, elo1=ELO1, alpha=ALPHA, beta=BETA):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1. - alpha))
+        self.upper = math.log((1. - beta) / alpha)
+        # Number of pairs scored 0, 1/2 and 1
+        self.counts = [0, 0, 0]
+
+    def add_pair(self, score):
+        """Record the total score (0, 1 or 2 wins) of the test agent in one
+        pair of games.
+        """
+        self.counts[score] += 1
+
+    @property
+    def pairs(self):
+        return sum(self.counts)
+
+    @property
+    def games(self):
+        return 2 * self.pairs
+
+    @property
+    def score(self):
+        """The mean score per game of the test agent. """
+        if not self.pairs:
+            return 0.5
+        return (0.5 * self.counts[1] + self.counts[2]) / self.pairs
+
+    def variance(self):
+        """Return the variance of the pair score. Half a pair of each
+        outcome is added to the counts, so that the first few pairs (which
+        often agree) do not make the variance vanish.
+        """
+        counts = [n + 0.5 for n in self.counts]
+        total = sum(counts)
+        mean = (0.5 * counts[1] + counts[2]) / total
+        return sum(n * (x - mean) ** 2
+                   for n, x in zip(counts, (0., 0.5, 1.))) / total
+
+    def llr(self):
+        """Return the log-likelihood ratio of H1 over H0. """
+        s0, s1 = elo_to_score(self.elo0), elo_to_score(self.elo1)
+        return (self.pairs * (s1 - s0) * (2 * self.score - s0 - s1) /
+                (2 * self.variance()))
+
+    @property
+    def result(self):
+        """`H0` or `H1` once a hypothesis is accepted, else None. """
+        llr = self.llr()
+        if llr >= self.upper:
+            return H1
+        if llr <= self.lower:
+            return H0
+        return None
+
+    def elo_interval(self, confidence=0.95):
+        """Return the estimated Elo difference of the test agent and the
+        bounds of its confidence interval.
+
+        Parameters
+        ----------
+        confidence : float (optional)
+            One of 0.9, 0.95 or 0.99.
+
+        Returns
+        -------
+        (float, float, float)
+            The Elo estimate and the lower and upper bounds.
+        """
+        margin = _Z[confidence] * math.sqrt(self.variance() / max(self.pairs, 1))
+        return (score_to_elo(self.score), score_to_elo(self.score - margin),
+                score_to_elo(self.score + margin))
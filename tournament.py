@@ -10,28 +10,67 @@ The matches are fair because the board is initialized randomly for both
 players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
+
+Use `python tournament.py --processes N` to play the games on a pool of N
+worker processes (0 for one per core), each pinned to its own core so that
+the agents in different games do not compete for CPU time. Pool workers
+cannot start processes of their own, so agents that do (pondering or lazy
+SMP agents) can only play with `--processes 1`.
+
+Use `python tournament.py --log results.jsonl` to write every finished game
+to an append-only log; running the same command again resumes the
+tournament, playing only the games that are not in the log yet, and the
+tables are computed by streaming through the log.
+
+Use `python tournament.py --sprt` to stop each pairing of a cpu agent and a
+test agent as soon as a sequential probability ratio test decides whether
+the test agent is stronger (see `sprt.py`), or after `--max-matches` fair
+matches, and report Elo differences with confidence intervals.
+
+Use `python tournament.py --ratings ratings.json` to keep Bradley-Terry
+ratings of every agent in a file across runs (see `ratings.py`). Agents
+that are already well rated, or have played enough games, are not played
+again, and each new agent only plays a few well-rated anchors; give an
+agent a new name whenever its code changes.
+
+Use `--seed N` to make the random choices of a run (openings, the order of
+legal moves and random agents) repeatable; games on a worker pool are each
+seeded from N and the game's place in the tournament, so they do not
+depend on which worker plays them. Results can still differ between runs
+where agents stop searching on a clock.
 """
+import argparse
 import itertools
+import json
+import multiprocessing
+import os
 import random
 import warnings
 
 from collections import namedtuple
 
-from isolation import Board
+import ratings
+import sprt
+
+from isolation import BitBoard, CLOCKS
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
-from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
-                        custom_score_2, custom_score_3)
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer, SEARCH_PVS,
+                        custom_score, custom_score_2, custom_score_3)
+from lazy_smp import LazySMPPlayer
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+CLOCK = "wall"  # clock used to time moves (see isolation.Board.play)
+SEED = None  # seed of all random choices (openings, move order, agents)
 
 DESCRIPTION = """
 This script evaluates the performance of the custom_score evaluation
 function against a baseline agent using alpha-beta search and iterative
-deepening (ID) called `AB_Improved`. The three `AB_Custom` agents use
+deepening (ID) called `AB_Baseline`. The three `AB_Custom` agents use
 ID and alpha-beta search with the custom_score functions defined in
-game_agent.py.
+game_agent.py, and `AB_PVS` uses the baseline heuristic with principal
+variation search, for a head-to-head comparison of the search modes.
 """
 
 Agent = namedtuple("Agent", ["player", "name"])
@@ -48,8 +87,8 @@ def play_round(cpu_agent, test_agents, win_counts, num_matches):
     forfeit_count = 0
     for _ in range(num_matches):
 
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
+        games = sum([[BitBoard(cpu_agent.player, agent.player),
+                      BitBoard(agent.player, cpu_agent.player)]
                     for agent in test_agents], [])
 
         # initialize all games with a random move and response
@@ -60,7 +99,7 @@ def play_round(cpu_agent, test_agents, win_counts, num_matches):
 
         # play all games and tally the results
         for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
+            winner, _, termination = game.play(time_limit=TIME_LIMIT, clock=CLOCK)
             win_counts[winner] += 1
 
         if termination == "timeout":
@@ -84,18 +123,11 @@ def play_matches(cpu_agents, test_agents, num_matches):
     total_forfeits = 0.
     total_matches = 2 * num_matches * len(cpu_agents)
 
-    print("\n{:^9}{:^13}{:^13}{:^13}{:^13}{:^13}".format(
-        "Match #", "Opponent", test_agents[0].name, test_agents[1].name,
-        test_agents[2].name, test_agents[3].name))
-    print("{:^9}{:^13} {:^5}| {:^5} {:^5}| {:^5} {:^5}| {:^5} {:^5}| {:^5}"
-          .format("", "", *(["Won", "Lost"] * 4)))
+    print_header(test_agents)
 
     for idx, agent in enumerate(cpu_agents):
-        wins = {test_agents[0].player: 0,
-                test_agents[1].player: 0,
-                test_agents[2].player: 0,
-                test_agents[3].player: 0,
-                agent.player: 0}
+        wins = {a.player: 0 for a in test_agents}
+        wins[agent.player] = 0
 
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
@@ -103,19 +135,46 @@ def play_matches(cpu_agents, test_agents, num_matches):
         total_timeouts += counts[0]
         total_forfeits += counts[1]
         total_wins = update(total_wins, wins)
-        _total = 2 * num_matches
-        round_totals = sum([[wins[agent.player], _total - wins[agent.player]]
-                            for agent in test_agents], [])
-        print(" {:^5}| {:^5} {:^5}| {:^5} {:^5}| {:^5} {:^5}| {:^5}"
-              .format(*round_totals))
+        print_round(test_agents, wins, num_matches)
 
-    print("-" * 74)
-    print("{:^9}{:^13}{:^13}{:^13}{:^13}{:^13}\n".format(
+    print_summary(test_agents, total_wins, total_matches, total_timeouts, total_forfeits)
+
+
+def print_header(test_agents):
+    """Print the column headings of the results table. """
+    columns = len(test_agents)
+    print(("\n{:^9}{:^13}" + "{:^13}" * columns).format(
+        "Match #", "Opponent", *[agent.name for agent in test_agents]))
+    print(("{:^9}{:^13}" + " {:^5}| {:^5}" * columns)
+          .format("", "", *(["Won", "Lost"] * columns)))
+
+
+def print_round(test_agents, wins, num_matches):
+    """Print the wins and losses of each test agent against one cpu agent,
+    completing the row started with the match number and opponent name.
+    """
+    _total = 2 * num_matches
+    round_totals = sum([[wins[agent.player], _total - wins[agent.player]]
+                        for agent in test_agents], [])
+    print((" {:^5}| {:^5}" * len(test_agents)).format(*round_totals))
+
+
+def print_summary(test_agents, total_wins, total_matches, total_timeouts,
+                  total_forfeits):
+    """Print the win rate of each test agent and any timeout or forfeit
+    warnings.
+    """
+    print("-" * (22 + 13 * len(test_agents)))
+    print(("{:^9}{:^13}" + "{:^13}" * len(test_agents) + "\n").format(
         "", "Win Rate:",
         *["{:.1f}%".format(100 * total_wins[a.player] / total_matches)
           for a in test_agents]
     ))
+    print_warnings(total_timeouts, total_forfeits)
+
 
+def print_warnings(total_timeouts, total_forfeits):
+    """Print any timeout or forfeit warnings. """
     if total_timeouts:
         print(("\nThere were {} timeouts during the tournament -- make sure " +
                "your agent handles search timeout correctly, and consider " +
@@ -126,15 +185,502 @@ def play_matches(cpu_agents, test_agents, num_matches):
                "legal moves available to play.\n").format(total_forfeits))
 
 
+def play_pair(cpu_agent, test_agent):
+    """Play one "fair" match of two games between the agents from the same
+    random opening, once with each agent moving first.
+
+    Returns
+    -------
+    (int, int, int)
+        The number of games won by the test agent, and the number of
+        timeouts and of test agent forfeits.
+    """
+    games = [BitBoard(cpu_agent.player, test_agent.player),
+             BitBoard(test_agent.player, cpu_agent.player)]
+
+    # initialize both games with a random move and response
+    for _ in range(2):
+        move = random.choice(games[0].get_legal_moves())
+        for game in games:
+            game.apply_move(move)
+
+    wins = timeouts = forfeits = 0
+    for game in games:
+        winner, _, termination = game.play(time_limit=TIME_LIMIT, clock=CLOCK)
+        if winner == test_agent.player:
+            wins += 1
+        if termination == "timeout":
+            timeouts += 1
+        elif winner != test_agent.player and termination == "forfeit":
+            forfeits += 1
+    return wins, timeouts, forfeits
+
+
+def play_sequential_matches(cpu_agents, test_agents, max_matches,
+                            elo0=sprt.ELO0, elo1=sprt.ELO1,
+                            alpha=sprt.ALPHA, beta=sprt.BETA):
+    """Play fair matches between each cpu agent and each test agent until a
+    sequential probability ratio test accepts either hypothesis about their
+    Elo difference, or until `max_matches` matches have been played, and
+    print the Elo estimate and 95% confidence interval of every pairing.
+
+    Parameters
+    ----------
+    cpu_agents, test_agents : list<Agent>
+        The opponents and the agents being evaluated.
+
+    max_matches : int
+        The largest number of fair matches (pairs of games) per pairing.
+
+    elo0, elo1, alpha, beta : float (optional)
+        The hypotheses and error rates of each test (see `sprt.SPRT`).
+
+    Returns
+    -------
+    dict
+        The `sprt.SPRT` of each (cpu agent name, test agent name) pairing.
+    """
+    tests = {}
+    total_timeouts = 0
+    total_forfeits = 0
+    print("\n{:^13}{:^13}{:^8}{:^8}{:^24}{:^8}".format(
+        "Opponent", "Agent", "Games", "Score", "Elo (95% CI)", "Result"))
+    print("-" * 74)
+    for cpu_agent in cpu_agents:
+        for test_agent in test_agents:
+            test = tests[(cpu_agent.name, test_agent.name)] = sprt.SPRT(
+                elo0, elo1, alpha, beta)
+            while test.result is None and test.pairs < max_matches:
+                wins, timeouts, forfeits = play_pair(cpu_agent, test_agent)
+                test.add_pair(wins)
+                total_timeouts += timeouts
+                total_forfeits += forfeits
+
+            elo, lower, upper = test.elo_interval()
+            print("{:^13}{:^13}{:^8}{:^8}{:^24}{:^8}".format(
+                cpu_agent.name, test_agent.name, test.games,
+                "{:.1f}%".format(100 * test.score),
+                "{:+.0f} [{:+.0f}, {:+.0f}]".format(elo, lower, upper),
+                test.result or "-"), flush=True)
+    print("-" * 74)
+    print_warnings(total_timeouts, total_forfeits)
+    return tests
+
+
+def play_rated_matches(cpu_agents, test_agents, num_matches, store,
+                       anchor_count=ratings.ANCHOR_COUNT):
+    """Rate every agent that is not yet settled in the store (see
+    `ratings.RatingStore.is_settled`) by playing fair matches against a few
+    well-rated anchors, saving the store after each pairing, and print the
+    ratings.
+
+    If none of the cpu agents has played yet, they first play a round robin
+    among themselves to seed the pool of anchors.
+
+    Parameters
+    ----------
+    cpu_agents, test_agents : list<Agent>
+        The agents that may be rated or used as anchors. Agent names must
+        be unique.
+
+    num_matches : int
+        The number of fair matches against each opponent.
+
+    store : `ratings.RatingStore`
+        The persistent results of earlier games.
+
+    anchor_count : int (optional)
+        The number of anchors played by each new agent.
+    """
+    agents = {agent.name: agent for agent in cpu_agents + test_agents}
+    if len(agents) != len(cpu_agents) + len(test_agents):
+        raise ValueError("Agent names must be unique")
+    total_timeouts = 0
+    total_forfeits = 0
+
+    def play(agent, opponent):
+        nonlocal total_timeouts, total_forfeits
+        for _ in range(num_matches):
+            wins, timeouts, forfeits = play_pair(opponent, agent)
+            store.record(agent.name, opponent.name, wins)
+            store.record(opponent.name, agent.name, 2 - wins)
+            total_timeouts += timeouts
+            total_forfeits += forfeits
+        store.save()
+        print("{:>13} vs {:<13} played {} games".format(
+            agent.name, opponent.name, 2 * num_matches), flush=True)
+
+    if not any(store.games(agent.name) for agent in cpu_agents):
+        for agent, opponent in itertools.combinations(cpu_agents, 2):
+            play(agent, opponent)
+
+    for agent in cpu_agents + test_agents:
+        if store.is_settled(agent.name):
+            continue
+        for name in store.anchors(agent.name, anchor_count, pool=agents):
+            play(agent, agents[name])
+
+    all_ratings = store.ratings()
+    print("\n{:^21}{:^13}{:^13}{:^13}".format("Agent", "Rating", "Error", "Games"))
+    print("-" * 60)
+    for name in sorted(all_ratings, key=lambda n: -all_ratings[n][0]):
+        rating, error = all_ratings[name]
+        print("{:^21}{:^13.0f}{:^13}{:^13}".format(
+            name, rating, "+/- {:.0f}".format(error), store.games(name)))
+    print("-" * 60)
+    print_warnings(total_timeouts, total_forfeits)
+
+
+# Agents of the tournament in each worker process, set by _init_worker
+_worker_agents = None
+
+
+def _init_worker(cpu_agents, test_agents, cores, clock, seed):
+    """Pool initializer: pin the worker to the next free core and keep the
+    agents for the games played by the worker.
+    """
+    global _worker_agents, CLOCK, SEED
+    _worker_agents = (cpu_agents, test_agents)
+    CLOCK = clock
+    SEED = seed
+    core = cores.get()
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    # Forked workers inherit the parent's random state; reseed so that
+    # random agents do not play the same moves in every worker
+    random.seed()
+
+
+def _play_game(task):
+    """Play one tournament game, in a worker process or in the main process
+    (after `_init_worker`).
+
+    Parameters
+    ----------
+    task : (int, int, int, bool, list<(int, int)>)
+        The index of the cpu agent and of the test agent, the match number,
+        whether the cpu agent moves first, and the opening moves applied
+        before play.
+
+    Returns
+    -------
+    dict
+        The log record of the game (see `play_logged_matches`).
+    """
+    cpu_idx, test_idx, match, cpu_first, opening = task
+    if SEED is not None:
+        random.seed("{}-{}-{}-{}-{}".format(SEED, cpu_idx, test_idx, match, cpu_first))
+    cpu_agents, test_agents = _worker_agents
+    cpu_player = cpu_agents[cpu_idx].player
+    test_player = test_agents[test_idx].player
+    if cpu_first:
+        game = BitBoard(cpu_player, test_player)
+    else:
+        game = BitBoard(test_player, cpu_player)
+    for move in opening:
+        game.apply_move(move)
+    move_times = []
+    winner, history, termination = game.play(
+        time_limit=TIME_LIMIT, clock=CLOCK, move_times=move_times)
+    return {"cpu": cpu_agents[cpu_idx].name,
+            "test": test_agents[test_idx].name,
+            "match": match,
+            "cpu_first": cpu_first,
+            "opening": [list(move) for move in opening],
+            "winner": test_agents[test_idx].name if winner == test_player
+                      else cpu_agents[cpu_idx].name,
+            "test_won": winner == test_player,
+            "termination": termination,
+            "moves": history,
+            "move_times": [round(t, 3) for t in move_times]}
+
+
+def _game_key(record):
+    """Identify a game of the tournament in the log. """
+    return record["cpu"], record["test"], record["match"], record["cpu_first"]
+
+
+def _make_tasks(cpu_agents, test_agents, num_matches, openings=None, done=()):
+    """Return the games of the tournament as `_play_game` tasks, ordered by
+    cpu agent, skipping the keys in `done`.
+
+    Every game of a fair match (each test agent, in both seats) starts from
+    the same random opening, as in `play_round`; `openings` maps
+    (cpu agent name, match number) to openings already drawn for earlier
+    games of the match.
+    """
+    openings = {} if openings is None else openings
+    tasks = []
+    for cpu_idx, cpu_agent in enumerate(cpu_agents):
+        for match in range(num_matches):
+            opening = openings.get((cpu_agent.name, match))
+            if opening is None:
+                # initialize all games with a random move and response
+                game = BitBoard("Player1", "Player2")
+                opening = []
+                for _ in range(2):
+                    move = random.choice(game.get_legal_moves())
+                    game.apply_move(move)
+                    opening.append(move)
+            opening = [tuple(move) for move in opening]
+            for test_idx, test_agent in enumerate(test_agents):
+                for cpu_first in (True, False):
+                    if (cpu_agent.name, test_agent.name, match, cpu_first) not in done:
+                        tasks.append((cpu_idx, test_idx, match, cpu_first, opening))
+    return tasks
+
+
+def _starts_processes(player):
+    """Test whether the agent starts helper processes of its own. """
+    return (getattr(player, "ponder", False) or
+            isinstance(player, LazySMPPlayer) and player.workers > 1)
+
+
+def _make_pool(cpu_agents, test_agents, processes):
+    """Return a pool of worker processes pinned to distinct cores.
+
+    Raises
+    ------
+    ValueError
+        If an agent starts processes of its own (see `_starts_processes`),
+        which the daemonic workers of a pool are not allowed to do.
+    """
+    for agent in cpu_agents + test_agents:
+        if _starts_processes(agent.player):
+            raise ValueError("{} starts its own processes and cannot play "
+                             "in a worker pool".format(agent.name))
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = [None] * (os.cpu_count() or 1)
+    processes = min(processes or len(cores), len(cores))
+    core_queue = multiprocessing.Queue()
+    for core in cores[:processes]:
+        core_queue.put(core)
+    return multiprocessing.Pool(processes, _init_worker,
+                                (cpu_agents, test_agents, core_queue, CLOCK, SEED))
+
+
+def play_matches_parallel(cpu_agents, test_agents, num_matches, processes=None):
+    """Play the same matches as `play_matches` on a pool of worker processes
+    and print the same tables.
+
+    Every game of a fair match (each test agent, in both seats) starts from
+    the same random opening, as in `play_round`. Each worker process plays
+    one game at a time and is pinned to its own core where the platform
+    supports it, so that per-move time limits stay fair.
+
+    Parameters
+    ----------
+    cpu_agents, test_agents : list<Agent>
+        The opponents and the agents being evaluated.
+
+    num_matches : int
+        The number of fair matches against each opponent.
+
+    processes : int (optional)
+        The number of worker processes; one per available core if None.
+    """
+    tasks = _make_tasks(cpu_agents, test_agents, num_matches)
+    games_per_round = 2 * num_matches * len(test_agents)
+    test_players = {agent.name: agent.player for agent in test_agents}
+
+    total_wins = {agent.player: 0 for agent in test_agents}
+    total_timeouts = 0
+    total_forfeits = 0
+    print_header(test_agents)
+    with _make_pool(cpu_agents, test_agents, processes) as pool:
+        # Results arrive in task order, so each round is printed as soon as
+        # its last game finishes
+        results = pool.imap(_play_game, tasks)
+        for idx, agent in enumerate(cpu_agents):
+            print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
+            wins = {a.player: 0 for a in test_agents}
+            for _ in range(games_per_round):
+                record = next(results)
+                if record["test_won"]:
+                    wins[test_players[record["test"]]] += 1
+                if record["termination"] == "timeout":
+                    total_timeouts += 1
+                elif not record["test_won"] and record["termination"] == "forfeit":
+                    total_forfeits += 1
+            total_wins = update(total_wins, wins)
+            print_round(test_agents, wins, num_matches)
+
+    print_summary(test_agents, total_wins, 2 * num_matches * len(cpu_agents),
+                  total_timeouts, total_forfeits)
+
+
+def read_log(log_path):
+    """Stream the game records of a results log one at a time.
+
+    A final line that was only partly written (e.g. when the tournament was
+    killed) is ignored, and a missing log has no records.
+    """
+    if not os.path.exists(log_path):
+        return
+    with open(log_path) as log_file:
+        for line in log_file:
+            if not line.endswith("\n"):
+                break
+            yield json.loads(line)
+
+
+def _truncate_partial_record(log_path, chunk_size=4096):
+    """Remove a partly written last record from the log, reading back from
+    the end of the file only as far as the last newline.
+    """
+    with open(log_path, "rb+") as log_file:
+        end = log_file.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(pos - chunk_size, 0)
+            log_file.seek(start)
+            newline = log_file.read(pos - start).rfind(b"\n")
+            if newline >= 0:
+                pos = start + newline + 1
+                break
+            pos = start
+        if pos < end:
+            log_file.truncate(pos)
+
+
+def play_logged_matches(cpu_agents, test_agents, num_matches, log_path,
+                        processes=1):
+    """Play the tournament, appending each finished game to a log, and
+    print the tables computed from the log.
+
+    Games already in the log are not played again, and the remaining games
+    of a partly played match use the opening recorded for it, so an
+    interrupted tournament can be resumed by running it again with the
+    same log. Each record is one line of JSON with the agent names, the
+    match number, the seat (`cpu_first`), the opening, the winner's name,
+    whether the test agent won, the termination reason, the move history
+    and the time taken by each move in milliseconds.
+
+    Parameters
+    ----------
+    cpu_agents, test_agents : list<Agent>
+        The opponents and the agents being evaluated. Agent names must be
+        unique within each list.
+
+    num_matches : int
+        The number of fair matches against each opponent.
+
+    log_path : str
+        The location of the results log.
+
+    processes : int (optional)
+        The number of worker processes (see `play_matches_parallel`); 1
+        plays the games in the main process.
+    """
+    done = set()
+    openings = {}
+    for record in read_log(log_path):
+        done.add(_game_key(record))
+        openings[(record["cpu"], record["match"])] = record["opening"]
+    tasks = _make_tasks(cpu_agents, test_agents, num_matches, openings, done)
+    print("Playing {} games ({} already in {})".format(
+        len(tasks), len(done), log_path))
+
+    # Truncate a partly written last record before appending
+    if os.path.exists(log_path):
+        _truncate_partial_record(log_path)
+
+    with open(log_path, "a") as log_file:
+        def append(record):
+            log_file.write(json.dumps(record) + "\n")
+            log_file.flush()
+            os.fsync(log_file.fileno())
+
+        if processes == 1:
+            global _worker_agents
+            _worker_agents = (cpu_agents, test_agents)
+            for task in tasks:
+                append(_play_game(task))
+        else:
+            with _make_pool(cpu_agents, test_agents, processes) as pool:
+                for record in pool.imap_unordered(_play_game, tasks):
+                    append(record)
+
+    summarize_log(log_path, cpu_agents, test_agents, num_matches)
+
+
+def summarize_log(log_path, cpu_agents, test_agents, num_matches):
+    """Print the tables of `play_matches` for the games in a results log,
+    streaming through the log without keeping the records in memory.
+    Records of agents that are not in the given lists are ignored.
+    """
+    cpu_names = {agent.name for agent in cpu_agents}
+    test_players = {agent.name: agent.player for agent in test_agents}
+    wins = {agent.name: {a.player: 0 for a in test_agents} for agent in cpu_agents}
+    total_timeouts = 0
+    total_forfeits = 0
+    for record in read_log(log_path):
+        if record["cpu"] not in cpu_names or record["test"] not in test_players:
+            continue
+        if record["test_won"]:
+            wins[record["cpu"]][test_players[record["test"]]] += 1
+        if record["termination"] == "timeout":
+            total_timeouts += 1
+        elif not record["test_won"] and record["termination"] == "forfeit":
+            total_forfeits += 1
+
+    total_wins = {agent.player: 0 for agent in test_agents}
+    print_header(test_agents)
+    for idx, agent in enumerate(cpu_agents):
+        print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="")
+        total_wins = update(total_wins, wins[agent.name])
+        print_round(test_agents, wins[agent.name], num_matches)
+    print_summary(test_agents, total_wins, 2 * num_matches * len(cpu_agents),
+                  total_timeouts, total_forfeits)
+
+
 def main():
+    global CLOCK, SEED
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of worker processes playing games in "
+                             "parallel (0 for one per core); agents that "
+                             "ponder or use lazy SMP need 1")
+    parser.add_argument("--clock", choices=sorted(CLOCKS),
+                        default=CLOCK,
+                        help="clock used to time each move: wall-clock time, "
+                             "or the CPU time of the process or thread "
+                             "playing the game")
+    parser.add_argument("--log", default=None,
+                        help="append each finished game to this log, and "
+                             "resume the tournament recorded in it")
+    parser.add_argument("--sprt", action="store_true",
+                        help="stop each pairing once a sequential test "
+                             "decides it, and report Elo intervals")
+    parser.add_argument("--max-matches", type=int, default=100,
+                        help="largest number of fair matches per pairing "
+                             "with --sprt")
+    parser.add_argument("--elo0", type=float, default=sprt.ELO0,
+                        help="Elo difference under the null hypothesis")
+    parser.add_argument("--elo1", type=float, default=sprt.ELO1,
+                        help="Elo difference under the alternative hypothesis")
+    parser.add_argument("--ratings", default=None,
+                        help="rate new agents against well-rated anchors and "
+                             "keep the ratings in this file")
+    parser.add_argument("--seed", type=int, default=SEED,
+                        help="seed every random choice of the tournament")
+    args = parser.parse_args()
+    CLOCK = args.clock
+    SEED = args.seed
+    if SEED is not None:
+        random.seed(SEED)
 
     # Define two agents to compare -- these agents will play from the same
     # starting position against the same adversaries in the tournament
     test_agents = [
-        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
+        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Baseline"),
         Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
         Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3"),
+        Agent(AlphaBetaPlayer(score_fn=improved_score, search_mode=SEARCH_PVS),
+              "AB_PVS")
     ]
 
     # Define a collection of agents to compete against the test agents
@@ -152,7 +698,20 @@ def main():
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    if args.ratings is not None:
+        play_rated_matches(cpu_agents, test_agents, NUM_MATCHES,
+                           ratings.RatingStore(args.ratings))
+    elif args.sprt:
+        play_sequential_matches(cpu_agents, test_agents, args.max_matches,
+                                args.elo0, args.elo1)
+    elif args.log is not None:
+        play_logged_matches(cpu_agents, test_agents, NUM_MATCHES, args.log,
+                            args.processes)
+    elif args.processes == 1:
+        play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    else:
+        play_matches_parallel(cpu_agents, test_agents, NUM_MATCHES,
+                              args.processes or None)
 
 
 if __name__ == "__main__":